@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from PyQt5.QtWidgets import QApplication
@@ -15,4 +16,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # 制作种子时使用进程池，打包后需要
+    multiprocessing.freeze_support()
     main()
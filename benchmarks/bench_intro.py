@@ -0,0 +1,57 @@
+"""
+发布简介处理的微基准：原来每次发布都 prettify 并发送格式化后的 html，
+现在自动发布只压缩（命中缓存时不做任何处理）
+
+    python -m benchmarks.bench_intro --images 20
+"""
+import argparse
+import timeit
+
+from utils.intro import IntroCache, minify, prettify
+
+PARAGRAPH = (
+    '<p><strong>织梦字幕组</strong>招募翻译、校对、时轴、压制！<br/>\n'
+    '  欢迎加入 <a href="https://example.com/join">招募页面</a>，<em>一起</em>做番。</p>\n'
+)
+IMAGE = '<p><img src="https://img30.360buyimg.com/imgzone/jfs/t1/{i}/poster.png" alt="poster {i}"/></p>\n'
+TABLE = (
+    '<table>\n  <tr><th>集数</th><th>标题</th></tr>\n'
+    + ''.join(f'  <tr><td>{i:02d}</td><td>第 {i} 话</td></tr>\n' for i in range(1, 25))
+    + '</table>\n'
+)
+
+
+def make_intro(images: int, paragraphs: int) -> str:
+    return (
+        '<!-- 简介模板 -->\n<div>\n'
+        + PARAGRAPH * paragraphs
+        + ''.join(IMAGE.format(i=i) for i in range(images))
+        + TABLE
+        + '<pre>  保留  空白  </pre>\n</div>\n'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='简介处理微基准')
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--paragraphs', type=int, default=20)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    intro = make_intro(args.images, args.paragraphs)
+    pretty = prettify(intro)
+    cache = IntroCache()
+    print(f'source {len(intro.encode()) / 1024:.1f} KiB, prettified {len(pretty.encode()) / 1024:.1f} KiB, '
+          f'minified {len(minify(intro).encode()) / 1024:.1f} KiB, '
+          f'minified from prettified {len(minify(pretty).encode()) / 1024:.1f} KiB')
+    for name, func in (
+        ('prettify', lambda: prettify(intro)),
+        ('minify', lambda: minify(intro)),
+        ('cached', lambda: cache.minify(intro, 'torrent')),
+    ):
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f'{name:>10}: {best * 1000:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+json 后端的微基准：在 /api/torrent/my、/api/v2/torrent/upload 的响应以及配置文件上
+对比标准库 json、ujson（已安装时）与 `utils.jsonlib`（orjson）的解码和编码，
+以及把发布历史整体读入与按 NDJSON 逐行读取的耗时
+
+    python -m benchmarks.bench_json --page-size 100 --intro-size 16384
+"""
+import argparse
+import io
+import json as stdjson
+import timeit
+
+import utils.jsonlib as json
+from benchmarks.mock_server import MockBangumiServer, MockOptions
+from utils.configs import conf
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def make_payloads(page_size: int, intro_size: int) -> dict[str, object]:
+    with MockBangumiServer(options=MockOptions(intro_size=intro_size, page_size=page_size)) as server:
+        title = '[织梦字幕组][模拟番剧][12集][AVC][简日双语][1080P]'
+        upload = {
+            'success': True,
+            'file_id': '0' * 24,
+            'content': [[title + '.mkv', '1.00 GB']],
+            'torrents': server.predictions_for(title),
+        }
+        return {'my': server.my_page(1), 'upload': upload, 'configs': conf.to_dict()}
+
+
+def backends() -> dict[str, tuple]:
+    """名称 -> (loads(bytes), dumps -> bytes)"""
+    result = {
+        'json': (stdjson.loads, lambda obj: stdjson.dumps(obj, ensure_ascii=False).encode('utf-8')),
+    }
+    if ujson is not None:
+        result['ujson'] = (ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'))
+    result['jsonlib'] = (json.loads, json.dumpb)
+    return result
+
+
+def best_of(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def bench_history(torrents: list, number: int):
+    """同样的种子，一个 json 数组整体解码与 NDJSON 逐行解码"""
+    whole = json.dumpb(torrents)
+    lines = io.BytesIO()
+    json.dump_lines(torrents, lines)
+    lines = lines.getvalue()
+    t_whole = best_of(lambda: json.loads(whole), number)
+    t_lines = best_of(lambda: sum(1 for _ in json.iterload(io.BytesIO(lines))), number)
+    print(f'history ({len(torrents)} torrents, {len(whole) / 1024:.0f} KiB):')
+    print(f'{"array":>12}: {t_whole * 1000:8.3f} ms')
+    print(f'{"ndjson":>12}: {t_lines * 1000:8.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='json 后端微基准')
+    parser.add_argument('--page-size', type=int, default=100, help='每页的种子数')
+    parser.add_argument('--intro-size', type=int, default=16384, help='introduction 的字节数')
+    parser.add_argument('--history', type=int, default=10, help='历史数据包含的页数')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.page_size, args.intro_size)
+    for name, payload in payloads.items():
+        data = json.dumpb(payload)
+        print(f'{name} ({len(data) / 1024:.1f} KiB):')
+        for backend, (loads, dumps) in backends().items():
+            assert loads(dumps(payload)) == payload
+            t_loads = best_of(lambda: loads(data), args.number)
+            t_dumps = best_of(lambda: dumps(payload), args.number)
+            print(f'{backend:>12}: loads {t_loads * 1e6:10.1f} us  dumps {t_dumps * 1e6:10.1f} us')
+
+    bench_history(payloads['my']['torrents'] * args.history, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+上传 + 发布的压力测试，对比同步逐个发布与 `utils.publish.publish_batch` 的吞吐量
+
+    python -m benchmarks.bench_load --count 50 --latency 0.05 --concurrency 10
+
+默认不限流，`--upload-rate`/`--publish-rate` 可以模拟客户端限流下的吞吐量。
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from httpx import URL
+
+from benchmarks.mock_server import MockBangumiServer, MockOptions
+from core.client import Bangumi
+from utils.aio import run_sync
+from utils.bangumi import PublishInfo, assert_team
+from utils.publish import PublishJob, publish_batch
+from utils.ratelimit import RateLimiter
+
+
+def make_jobs(root: Path, count: int) -> list[PublishJob]:
+    jobs = []
+    for i in range(count):
+        title = f'[织梦字幕组][压力测试 Load Test][{i + 10:02d}集][AVC][简日双语][1080P]'
+        path = root / (title + '.mkv.torrent')
+        path.write_bytes(b'd4:infod6:lengthi1e4:name1:a12:piece lengthi16384e6:pieces20:' + b'0' * 20 + b'ee')
+        jobs.append(PublishJob(i, path, title))
+    return jobs
+
+
+def bench_sync(client: Bangumi, myteam, jobs: list[PublishJob]) -> float:
+    start = time.perf_counter()
+    for job in jobs:
+        resp = client.upload_torrent(job.torrentpath, myteam.id)
+        pubInfo = PublishInfo(myteam, resp, job.title)
+        pubInfo.loadInfoFromBestPrediction(resp, allow_edit=False)
+        client.publish(**pubInfo.to_publish_info())
+    return time.perf_counter() - start
+
+
+def bench_concurrent(client: Bangumi, myteam, jobs: list[PublishJob], concurrency: int) -> float:
+    start = time.perf_counter()
+    report = run_sync(publish_batch(client.as_async(), myteam, jobs, concurrency))
+    elapsed = time.perf_counter() - start
+    assert not report.failed, report.summary()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='上传 + 发布压力测试')
+    parser.add_argument('--count', type=int, default=50, help='发布的种子数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务器每个请求的延迟秒数')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟服务器返回 503 的概率')
+    parser.add_argument('--intro-size', type=int, default=4096)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--upload-rate', type=float, default=0.0, help='上传接口每秒请求数，0 为不限')
+    parser.add_argument('--publish-rate', type=float, default=0.0, help='发布接口每秒请求数，0 为不限')
+    parser.add_argument('--burst', type=int, default=1)
+    args = parser.parse_args()
+    limiter = RateLimiter({
+        '/api/v2/torrent/upload': (args.upload_rate, args.burst),
+        '/api/torrent/add': (args.publish_rate, args.burst),
+    })
+
+    options = MockOptions(latency=args.latency, error_rate=args.error_rate, intro_size=args.intro_size)
+    with MockBangumiServer(options=options) as server, tempfile.TemporaryDirectory() as tmp:
+        client = Bangumi.login_with_password('mock', 'mock', base_url=URL(server.url), limiter=limiter)
+        myteam = assert_team(client)
+        jobs = make_jobs(Path(tmp), args.count)
+
+        print(f'{args.count} publishes, latency {args.latency}s, error rate {args.error_rate}')
+        elapsed = bench_sync(client, myteam, jobs)
+        print(f'{"sync":>16}: {elapsed:8.3f}s  {args.count / elapsed:8.2f} publishes/s')
+        for concurrency in args.concurrency:
+            elapsed = bench_concurrent(client, myteam, jobs, concurrency)
+            print(f'{"concurrent x" + str(concurrency):>16}: {elapsed:8.3f}s  {args.count / elapsed:8.2f} publishes/s')
+        print('connections:', client.connection_stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+模型构造的微基准：`UploadResponse` 与 `My` 从已解码的 json 构造的吞吐量，
+以及惰性视图在匹配历史发布（读取全部标题，再读取一个种子的分类、标签和简介）时的耗时
+
+    python -m benchmarks.bench_models --torrents 30 --predictions 5
+"""
+import argparse
+import timeit
+
+from benchmarks.mock_server import MockBangumiServer, MockOptions
+from models.bangumi import My, UploadResponse
+from models.lazy import LazyMy, LazyUploadResponse
+
+
+def make_payloads(torrents: int, predictions: int) -> tuple[dict, dict]:
+    options = MockOptions(intro_size=256, page_size=torrents, predictions=predictions)
+    with MockBangumiServer(options=options) as server:
+        title = '[织梦字幕组][模拟番剧][12集][AVC][简日双语][1080P]'
+        upload = {
+            'success': True,
+            'file_id': '0' * 24,
+            'content': [[title + '.mkv', '1.00 GB']],
+            'torrents': server.predictions_for(title),
+        }
+        return upload, server.my_page(1)
+
+
+def match(resp):
+    """模拟 `PublishInfo.loadInfoFromBestPrediction` 访问的字段"""
+    titles = [t.title for t in resp.torrents]
+    best = resp.torrents[len(titles) // 2]
+    return best.category_tag, best.tags, best.introduction
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型构造微基准')
+    parser.add_argument('--torrents', type=int, default=30, help='My 每页的种子数')
+    parser.add_argument('--predictions', type=int, default=5, help='UploadResponse 中的历史种子数')
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    upload, my = make_payloads(args.torrents, args.predictions)
+    for name, model, payload, count in (
+        ('UploadResponse', UploadResponse, upload, args.predictions),
+        ('My', My, my, args.torrents),
+    ):
+        best = min(timeit.repeat(lambda: model.parse_obj(payload), number=args.number, repeat=5)) / args.number
+        print(f'{name:>22}: {best * 1e6:10.1f} us/object  {count / best:10.0f} torrents/s')
+
+    print('parse + match:')
+    for name, model, payload in (
+        ('UploadResponse', UploadResponse, upload),
+        ('LazyUploadResponse', LazyUploadResponse, upload),
+        ('My', My, my),
+        ('LazyMy', LazyMy, my),
+    ):
+        best = min(timeit.repeat(lambda: match(model.parse_obj(payload)), number=args.number, repeat=5)) / args.number
+        print(f'{name:>22}: {best * 1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+解析 /api/torrent/my 响应的微基准，对比先解码为 str 再 `parse_raw` 与直接从 bytes 解析
+
+    python -m benchmarks.bench_parse --page-size 100 --intro-size 16384
+"""
+import argparse
+import timeit
+
+from httpx import Response
+
+import utils.jsonlib as json
+from benchmarks.mock_server import MockBangumiServer, MockOptions
+from models.bangumi import My
+
+
+def make_response(page_size: int, intro_size: int) -> Response:
+    with MockBangumiServer(options=MockOptions(intro_size=intro_size, page_size=page_size)) as server:
+        body = json.dumps(server.my_page(1)).encode('utf-8')
+    return Response(200, content=body, headers={'content-type': 'application/json; charset=utf-8'})
+
+
+def parse_text(response: Response) -> My:
+    """旧的做法：response.text 解码后再由 pydantic 解析"""
+    # 每次都新建 Response，避免 httpx 缓存解码后的 text
+    return My.parse_raw(Response(200, content=response.content, headers=response.headers).text)
+
+
+def parse_bytes(response: Response) -> My:
+    return My.parse_obj(json.loads(response.content))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应解析微基准')
+    parser.add_argument('--page-size', type=int, default=100, help='每页的种子数')
+    parser.add_argument('--intro-size', type=int, default=16384, help='introduction 的字节数')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    response = make_response(args.page_size, args.intro_size)
+    assert parse_text(response) == parse_bytes(response)
+    print(f'page: {args.page_size} torrents, {len(response.content) / 1024:.0f} KiB')
+    for func in (parse_text, parse_bytes):
+        best = min(timeit.repeat(lambda: func(response), number=args.number, repeat=5)) / args.number
+        print(f'{func.__name__:>12}: {best * 1000:8.3f} ms/page')
+
+
+if __name__ == '__main__':
+    main()
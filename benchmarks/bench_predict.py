@@ -0,0 +1,70 @@
+"""
+匹配历史发布的微基准：在 `--titles` 个历史标题上建立索引的耗时，以及每次查询的耗时，
+与逐个解析并比较全部历史标题的线性查找对比
+
+    python -m benchmarks.bench_predict --titles 20000
+"""
+import argparse
+import random
+import time
+import timeit
+
+from utils.predict import TitleIndex, name_tokens, similarity
+from utils.releasename import parse_release
+
+CHARS = '织梦字幕组电锯人间谍过家家夫妇以上恋人未满宇崎学妹想要玩与猫共度的夜晚夏日重现哆啦梦大山补缺集第二季'
+FOREIGN = ['Chainsaw', 'Man', 'Spy', 'Family', 'Summer', 'Time', 'Rendering', 'Uzaki', 'chan', 'Asobitai', 'Koibito']
+
+
+def make_titles(count: int, seed: int = 0) -> list[str]:
+    """每个系列 24 集，系列名随机组合"""
+    rng = random.Random(seed)
+    titles = []
+    while len(titles) < count:
+        cn = ''.join(rng.choices(CHARS, k=rng.randint(3, 8)))
+        foreign = ' '.join(rng.choices(FOREIGN, k=rng.randint(0, 3)))
+        name = f'{cn} {foreign}' if foreign else cn
+        resolution = rng.choice(['1080P', '720P'])
+        titles.extend(f'[织梦字幕组][{name}][{ep:02d}集][AVC][简日双语][{resolution}]' for ep in range(1, 25))
+    return titles[:count]
+
+
+def linear_search(titles: list[str], title: str, limit: int) -> list[tuple[float, int]]:
+    """不建立索引：每次查询都解析并比较全部标题"""
+    query = parse_release(title)
+    tokens = name_tokens(query)
+    scored = []
+    for i, t in enumerate(titles):
+        release = parse_release.__wrapped__(t)
+        other = name_tokens(release)
+        overlap = len(tokens & other)
+        if overlap:
+            name = 1.0 if release.name == query.name else overlap / len(tokens | other)
+            scored.append((similarity(query, release, name), -i))
+    scored.sort(reverse=True)
+    return [(score, -i) for score, i in scored[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史匹配微基准')
+    parser.add_argument('--titles', type=int, default=20000, help='历史标题数')
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    queries = [t.replace('[01集]', '[25集]') for t in random.Random(1).sample(titles, args.queries)]
+
+    start = time.perf_counter()
+    index = TitleIndex(enumerate(titles))
+    print(f'index {len(index)} titles: {time.perf_counter() - start:.3f} s')
+
+    assert [i for _, i in index.search(parse_release(queries[0]), 5)] == \
+        [i for _, i in linear_search(titles, queries[0], 5)]
+    t_index = timeit.timeit(lambda: [index.search(parse_release(q)) for q in queries], number=1) / len(queries)
+    t_linear = timeit.timeit(lambda: linear_search(titles, queries[0], 5), number=1)
+    print(f'{"index":>8}: {t_index * 1000:8.3f} ms/query')
+    print(f'{"linear":>8}: {t_linear * 1000:8.3f} ms/query')
+
+
+if __name__ == '__main__':
+    main()
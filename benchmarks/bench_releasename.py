@@ -0,0 +1,86 @@
+"""
+标题解析的微基准：旧的 `parse_vidname`（每次调用都编译正则）与 `parse_release` 在缓存命中和未命中时的耗时
+
+标题来自本地的发布历史（`--history`），没有时使用内置的样例标题并展开到各集
+
+    python -m benchmarks.bench_releasename --history history.db
+"""
+import argparse
+import re
+import sqlite3
+import timeit
+from pathlib import Path
+from typing import Optional
+
+from utils.releasename import parse_release
+
+SAMPLES = [
+    '[织梦字幕组][哆啦A梦大山补缺集][1997年][{ep}][AVC][1080P]',
+    '[织梦字幕组][电锯人][{ep}集]',
+    '[织梦字幕组][电锯人 Chainsaw Man][{ep}集][AVC][简日双语][1080P]',
+    '[织梦字幕组][间谍过家家 SPY×FAMILY][{ep}集][AVC][简日双语][1080P]',
+    '[织梦字幕组][夫妇以上，恋人未满 Fuufu Ijou, Koibito Miman][{ep}集][AVC][简日双语][1080P]',
+    '[织梦字幕组][宇崎学妹想要玩 第二季 Uzaki-chan wa Asobita S2][{ep}集][1080P][AVC][简日双语]',
+    '[织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[{ep}][第十七夜][GB_JP][AVC][1080P]',
+    '[V2][织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[{ep} - END][第十三夜][GB_JP][AVC][1080P]',
+    '[V2][织梦字幕组]Summer Time Rendering 夏日重现[{ep}][2022.08.05][1080P][GB_JP][AVC].mp4',
+]
+
+
+def legacy_parse_vidname(vidname) -> tuple[str, str]:
+    """原来的实现"""
+    name = ''
+    pat1 = re.compile(r'\[织梦字幕组\]\[?\b([一-龥][^\]]*[一-龥])\b\]?\[')
+    pat2 = re.compile(
+        r'\[织梦字幕组\]\[?\b([一-龥][^\]]*[一-龥])\b \b([\w一-龥぀-ゟ゠-ヿ][^\[\]]*[\w一-龥぀-ゟ゠-ヿ])\b\]?\[')
+    pat3 = re.compile(
+        r'\[织梦字幕组\]\[?\b([\w一-龥぀-ゟ゠-ヿ][^\[\]]*[\w一-龥぀-ゟ゠-ヿ])\b \b([一-龥][^\]]*[一-龥])\b\]?\[')
+    if res := pat1.search(vidname):
+        name = res[1]
+    elif res := pat2.search(vidname):
+        name = res[1]
+    elif res := pat3.search(vidname):
+        name = res[1]
+    resl = ''
+    if res := re.search('1080|720', vidname):
+        resl = res[0]
+    return name, resl
+
+
+def load_titles(history: Optional[Path], episodes: int) -> list[str]:
+    if history is not None:
+        with sqlite3.connect(str(history)) as conn:
+            return [title for (title,) in conn.execute('SELECT title FROM torrents;')]
+    return [sample.format(ep=f'{ep:02d}') for sample in SAMPLES for ep in range(1, episodes + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='标题解析微基准')
+    parser.add_argument('--history', type=Path, help='发布历史数据库，默认使用内置样例')
+    parser.add_argument('--episodes', type=int, default=24, help='每个样例展开的集数')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    titles = load_titles(args.history, args.episodes)
+    print(f'{len(titles)} titles')
+
+    def cold():
+        parse_release.cache_clear()
+        for title in titles:
+            parse_release(title)
+
+    def warm():
+        for title in titles:
+            parse_release(title)
+
+    for name, func in (
+        ('legacy', lambda: [legacy_parse_vidname(title) for title in titles]),
+        ('cold', cold),
+        ('warm', warm),
+    ):
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f'{name:>8}: {best / len(titles) * 1e6:8.2f} us/title')
+
+
+if __name__ == '__main__':
+    main()
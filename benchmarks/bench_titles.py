@@ -0,0 +1,57 @@
+"""
+生成新一集标题的微基准：在 `--titles` 条发布历史上，为每个系列的下一集生成标题的吞吐量
+
+    python -m benchmarks.bench_titles --titles 20000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_predict import make_titles
+from benchmarks.mock_server import MockBangumiServer
+from models.bangumi import Torrent
+from utils.history import HistoryStore
+from utils.predict import Predictor
+from utils.releasename import parse_release, retitle
+from utils.titles import TitleSynthesizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='新一集标题微基准')
+    parser.add_argument('--titles', type=int, default=20000, help='历史标题数')
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    server = MockBangumiServer()
+    # 视频文件名只有字幕组、中文名、集数和分辨率
+    queries = []
+    for title in random.Random(1).sample(titles, args.queries):
+        release = parse_release(title)
+        queries.append(f'[{release.group}][{release.name_cn}][{release.episode + 24:02d}集][{release.resolution}P]')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(Path(tmp) / 'history.db')
+        store.add(Torrent.parse_obj(server.make_torrent(title, i)) for i, title in enumerate(titles))
+        synthesizer = TitleSynthesizer(Predictor(store))
+
+        start = time.perf_counter()
+        synthesizer.predictor.refresh()
+        print(f'index {len(titles)} titles: {time.perf_counter() - start:.3f} s')
+
+        print(f'{queries[0]} -> {synthesizer.synthesize(queries[0])}')
+        for name in ('cold', 'warm'):
+            if name == 'cold':
+                parse_release.cache_clear()
+                retitle.cache_clear()
+            start = time.perf_counter()
+            resolved = sum(synthesizer.synthesize(q) != q for q in queries)
+            elapsed = time.perf_counter() - start
+            print(f'{name:>8}: {len(queries) / elapsed:10.0f} titles/s ({resolved}/{len(queries)} from history)')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
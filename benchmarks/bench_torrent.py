@@ -0,0 +1,48 @@
+"""
+制作种子的微基准：单进程与进程池计算分块哈希的吞吐量
+
+测试文件默认在临时目录中生成（`--size` MiB 的随机数据），也可以用 `--file` 指定已有的视频；
+第二次读取时文件通常已经在页缓存中，结果反映的是哈希而不是磁盘的速度。
+
+    python -m benchmarks.bench_torrent --size 1024
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from utils.bencode import decode, encode
+from utils.torrent import create_torrent, piece_length_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description='制作种子微基准')
+    parser.add_argument('--file', type=Path, help='已有的文件，默认生成随机数据')
+    parser.add_argument('--size', type=int, default=512, help='生成的文件大小（MiB）')
+    parser.add_argument('--workers', type=int, default=0, help='进程数，0 为 CPU 核数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = Path(tmp) / 'sample.mkv'
+            with path.open('wb') as f:
+                for _ in range(args.size):
+                    f.write(os.urandom(1024 * 1024))
+        size = path.stat().st_size
+        print(f'{path.name}: {size / 2 ** 20:.0f} MiB, piece {piece_length_for(size) // 1024} KiB, '
+              f'{os.cpu_count()} cpus')
+
+        results = {}
+        for name, workers in (('single', 1), ('pool', args.workers)):
+            start = time.perf_counter()
+            results[name] = create_torrent(path, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f'{name:>8}: {elapsed:8.3f} s {size / 2 ** 20 / elapsed:10.1f} MiB/s')
+        assert results['single']['info'] == results['pool']['info']
+        assert decode(encode(results['pool']))[b'info'][b'pieces'] == results['single']['info']['pieces']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+本地模拟的萌番组服务器，用于离线测试和压力测试
+
+    python -m benchmarks.mock_server --port 8900 --latency 0.05 --error-rate 0.1
+
+客户端使用 `base_url=URL("http://127.0.0.1:8900/")` 登录即可。
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import regex as re
+
+import utils.jsonlib as json
+
+__all__ = ["MockOptions", "MockBangumiServer"]
+
+SESSION_COOKIE = "koa:sess"
+TEAM_NAME = "织梦字幕组"
+
+
+class MockOptions(object):
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        intro_size: int = 4096,
+        predictions: int = 5,
+        page_size: int = 30,
+        pages: int = 10,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        """每个请求额外的延迟秒数"""
+        self.error_rate = error_rate
+        """返回 503 的概率"""
+        self.intro_size = intro_size
+        """每个种子 introduction 的字节数"""
+        self.predictions = predictions
+        """上传种子后返回的历史种子数"""
+        self.page_size = page_size
+        """/api/torrent/my 每页的种子数"""
+        self.pages = pages
+        """/api/torrent/my 的总页数"""
+        self.seed = seed
+
+
+def make_tag(tag_id: str, name: str, type_: str) -> dict:
+    return {
+        "_id": tag_id,
+        "activity": 1,
+        "locale": {"zh_cn": name, "zh_tw": name, "en": name, "ja": name},
+        "name": name,
+        "syn_lowercase": [name.lower()],
+        "synonyms": [name],
+        "type": type_,
+    }
+
+
+CATEGORY = make_tag("549ef207fe682f7549f1ea90", "动画", "misc")
+TAGS = [
+    make_tag("548ee0ea4ab7379536f56354", TEAM_NAME, "team"),
+    make_tag("548ee2ce4ab7379536f56358", "简体", "lang"),
+    make_tag("5a2d3ae57be4b3e4e5bbd1fb", "1080p", "resolution"),
+]
+USER = {"_id": "5a2d3ae57be4b3e4e5bb0000", "username": "mock", "emailHash": "0" * 32,
+        "active": True, "regDate": "2020-01-01T00:00:00.000Z", "group": "member"}
+TEAM = {"_id": "5a2d3ae57be4b3e4e5bb1111", "admin_id": USER["_id"], "admin_ids": [USER["_id"]],
+        "approved": True, "auditing_ids": [], "editor_ids": [], "icon": "", "member_ids": [USER["_id"]],
+        "name": TEAM_NAME, "regDate": "2020-01-01T00:00:00.000Z", "signature": "", "tag_id": TAGS[0]["_id"]}
+
+_episode = re.compile(r"\[(\d{2,4})(集)?\]")
+
+
+class MockBangumiServer(object):
+    """在后台线程运行的模拟服务器，可用作上下文管理器"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, options: Optional[MockOptions] = None):
+        self.options = options or MockOptions()
+        self.random = random.Random(self.options.seed)
+        self.published = []  # type: list[dict]
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockBangumiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockBangumiServer":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    """payloads"""
+    def make_torrent(self, title: str, index: int = 0) -> dict:
+        digest = hashlib.sha1(f"{title}{index}".encode()).hexdigest()
+        intro = "<p>" + "织" * max(self.options.intro_size // 3 - 7, 0) + "</p>"
+        return {
+            "_id": digest[:24],
+            "title": title,
+            "introduction": intro,
+            "comments": 0, "downloads": 0, "finished": 0, "leechers": 0, "seeders": 0,
+            "publish_time": (datetime(2023, 1, 1) - timedelta(hours=index)).isoformat() + "Z",
+            "magnet": "magnet:?xt=urn:btih:" + digest,
+            "infoHash": digest,
+            "file_id": digest[:24],
+            "team_id": TEAM["_id"],
+            "teamsync": True,
+            "content": [[title + ".mkv", "1.00 GB"]],
+            "titleIndex": [],
+            "size": "1.00 GB",
+            "btskey": "",
+            "predicted_title": title,
+            "uploader_id": USER["_id"],
+            "uploader": {k: USER[k] for k in ("_id", "username", "emailHash")},
+            "tag_ids": [t["_id"] for t in TAGS],
+            "tags": TAGS,
+            "category_tag_id": CATEGORY["_id"],
+            "category_tag": CATEGORY,
+        }
+
+    def predictions_for(self, title: str) -> list[dict]:
+        """以往的同系列种子：集数依次递减"""
+        result = []
+        for i in range(1, self.options.predictions + 1):
+            past = _episode.sub(lambda m: f"[{max(int(m[1]) - i, 0):02d}{m[2] or ''}]", title, count=1)
+            result.append(self.make_torrent(past, i))
+        return result
+
+    def my_page(self, page: int) -> dict:
+        size = self.options.page_size
+        torrents = [
+            self.make_torrent(f"[{TEAM_NAME}][模拟番剧][{n:02d}集][AVC][简日双语][1080P]", n)
+            for n in range((page - 1) * size, page * size)
+        ] if 1 <= page <= self.options.pages else []
+        if page == 1:
+            with self._lock:
+                torrents = self.published[::-1] + torrents
+        return {"torrents": torrents, "page_count": self.options.pages}
+
+    """handler"""
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和响应体一次写出，避免 Nagle 与延迟确认带来的额外 40ms
+            wbufsize = 1 << 16
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, data, status: int = 200, headers: Optional[dict] = None):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json; charset=utf-8")
+                self.send_header("content-length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("content-length") or 0))
+
+            def logged_in(self) -> bool:
+                return SESSION_COOKIE in (self.headers.get("cookie") or "")
+
+            def before(self) -> bool:
+                with server._lock:
+                    server.requests += 1
+                if server.options.latency:
+                    time.sleep(server.options.latency)
+                if server.random.random() < server.options.error_rate:
+                    self.read_body()
+                    self.send_json({"success": False, "message": "mock error"}, 503)
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self.before():
+                    return
+                url = urlparse(self.path)
+                if url.path == "/api/user/session":
+                    self.send_json(USER if self.logged_in() else {})
+                elif url.path == "/api/team/myteam":
+                    self.send_json([TEAM] if self.logged_in() else [])
+                elif url.path == "/api/tag/misc":
+                    self.send_json([CATEGORY])
+                elif url.path == "/api/torrent/my":
+                    page = int(parse_qs(url.query).get("p", ["1"])[0])
+                    self.send_json(server.my_page(page))
+                else:
+                    self.send_json({}, 404)
+
+            def do_POST(self):
+                if not self.before():
+                    return
+                url = urlparse(self.path)
+                body = self.read_body()
+                if url.path == "/api/user/signin":
+                    self.send_json({"success": True, "user": USER},
+                                   headers={"set-cookie": f"{SESSION_COOKIE}=mock; path=/"})
+                elif url.path == "/api/tag/suggest":
+                    self.send_json(TAGS)
+                elif url.path == "/api/v2/torrent/upload":
+                    match = re.search(rb'filename="([^"]*)"', body)
+                    title = match[1].decode("utf-8") if match else "upload"
+                    for suffix in (".torrent", ".mkv", ".mp4"):
+                        title = title.removesuffix(suffix)
+                    self.send_json({
+                        "success": True,
+                        "file_id": hashlib.sha1(body).hexdigest()[:24],
+                        "content": [[title + ".mkv", "1.00 GB"]],
+                        "torrents": server.predictions_for(title),
+                    })
+                elif url.path == "/api/torrent/add":
+                    data = json.loads(body)
+                    torrent = server.make_torrent(data["title"]) | {"file_id": data["file_id"]}
+                    with server._lock:
+                        server.published.append(torrent)
+                    self.send_json({"success": True, "torrent": torrent})
+                else:
+                    self.send_json({}, 404)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的萌番组服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟秒数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的概率")
+    parser.add_argument("--intro-size", type=int, default=4096, help="introduction 的字节数")
+    parser.add_argument("--predictions", type=int, default=5, help="上传后返回的历史种子数")
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--pages", type=int, default=10)
+    args = parser.parse_args()
+    options = MockOptions(args.latency, args.error_rate, args.intro_size, args.predictions,
+                          args.page_size, args.pages)
+    server = MockBangumiServer(args.host, args.port, options)
+    print("mock bangumi.moe listening on", server.url)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,22 @@
+import asyncio
+import threading
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import AsyncIterator, List, Optional, Union
 
-from httpcore import URL
-from httpx import Client, Cookies
+from httpx import Cookies, Timeout, URL
 from pydantic import Field
-from requests.utils import cookiejar_from_dict
 from typing_extensions import Self
 
 from errors import (
     CookieExpired,
     LoginFailed,
     PublishFailed,
+    PublishTimeout,
     TorrentDuplicateError,
+    UploadTimeout,
     UploadTorrentException,
 )
 from models.bangumi import (
-    BangumiResponse,
     My,
     Tag,
     Torrent,
@@ -23,154 +24,212 @@ from models.bangumi import (
     Uploader,
     MyTeam,
 )
+from models.lazy import LazyMy, LazyUploadResponse
 from utils import jsonlib as json
-from utils.const import BANGUMI_MOE_HOST, PROJECT_ROOT
+from utils.const import BANGUMI_MOE_HOST, CACHE, HISTORY, NET, PROJECT_ROOT, PUBLISH
 from utils.helpers import str2md5
-from utils.net import Net
+from utils.aio import run_sync
+from utils.net import AsyncNet, Net, ProgressCallback, ProgressReader, make_client
 from utils.typedefs import StrOrPath
 
-__all__ = ["Bangumi"]
+__all__ = ["AsyncBangumi", "Bangumi"]
 
+UPLOAD_TIMEOUT = 30.0
+"""上传和发布时单次读写的超时秒数，整体耗时由 deadline 限制"""
 
-class Bangumi(Uploader, Net):
+
+class AsyncBangumi(Uploader, AsyncNet):
+    """萌番组客户端（异步）"""
     base_url: URL = BANGUMI_MOE_HOST
 
     active: bool
-    register_data: datetime = Field("regDate")
+    register_data: datetime = Field(alias="regDate")
     team_ids: Optional[List[str]]
     group: str
     cookies: Cookies
 
     @staticmethod
-    def test_connection(proxies: dict, url: URL) -> bool:
-        client = Client(
-            base_url=url,
-            headers={
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
-                "cache-control": "no-cache",
-                "DNT": "1",
-                "host": url.host,
-                "origin": "https://bangumi.moe",
-                "referer": "https://bangumi.moe/",
-            },
-            proxies=proxies
-        )
-        response = client.get('/')
+    async def test_connection(proxies: dict, url: URL, **client_options) -> bool:
+        net = AsyncNet.construct(base_url=url)
+        net._client = make_client(url, proxies=proxies, **client_options)
+        try:
+            response = await net.request("GET", '/')
+        finally:
+            await net.aclose()
         response.raise_for_status()
         return True
 
     @classmethod
-    def login_with_password(cls, username: str, password: str, proxies: dict = None) -> Self:
-        """使用用户名和密码来登录"""
-        client = Client(
-            base_url=BANGUMI_MOE_HOST,
-            headers={
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
-                "cache-control": "no-cache",
-                "DNT": "1",
-                "host": BANGUMI_MOE_HOST.host,
-                "origin": "https://bangumi.moe",
-                "referer": "https://bangumi.moe/",
-            },
-            proxies=proxies
-        )
-        response = client.post(
+    async def login_with_password(cls, username: str, password: str, proxies: dict = None,
+                                  base_url: URL = BANGUMI_MOE_HOST, **client_options) -> Self:
+        """使用用户名和密码来登录
+
+        `client_options` 会传给 `utils.net.make_client`，用于配置连接池
+        """
+        net = AsyncNet.construct(base_url=base_url)
+        net._client = make_client(base_url, proxies=proxies, **client_options)
+        response = await net.request(
+            "POST",
             "/api/user/signin",
             json={"username": username, "password": str2md5(password)},
         )
         response.raise_for_status()
-        json_data = json.loads(response.text)
+        json_data = json.loads(response.content)
         if not json_data["success"]:
+            await net.aclose()
             raise LoginFailed("登录失败，请检查您输入的用户名或密码是否正确。")
         result = cls.parse_obj(
-            json_data["user"] | {"cookies": response.cookies}
+            json_data["user"] | {"cookies": response.cookies, "base_url": base_url}
         )
-        result._client = client
+        result._client = net.client
         return result
 
     @classmethod
-    def login_with_cookies(cls, path: StrOrPath, proxies: dict=None) -> Self:
-        """使用保存的cookies来登录"""
-        with open(
-            PROJECT_ROOT.joinpath(path).resolve(), encoding="utf-8"
-        ) as file:
-            json_data = json.load(file)
-        cookiejar = cookiejar_from_dict(json_data)
-        cookies = Cookies(cookiejar)
+    async def login_with_cookies(cls, cookies: Union[StrOrPath, dict], proxies: dict=None,
+                                 base_url: URL = BANGUMI_MOE_HOST, **client_options) -> Self:
+        """使用保存的cookies来登录
+
+        `cookies` 可以是保存 cookies 的 json 文件路径，也可以是 cookies 字典。
+        """
+        if not isinstance(cookies, dict):
+            cookies = json.read_file(PROJECT_ROOT.joinpath(cookies).resolve())
+        cookies = Cookies(cookies)
         # api/user/session
-        client = Client(
-            base_url=BANGUMI_MOE_HOST,
-            headers={
-                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
-                "cache-control": "no-cache",
-                "DNT": "1",
-                "host": BANGUMI_MOE_HOST.host,
-                "origin": "https://bangumi.moe",
-                "referer": "https://bangumi.moe/",
-            },
-            proxies=proxies
-        )
-        response = client.get("/api/user/session", cookies=cookies)
+        net = AsyncNet.construct(base_url=base_url)
+        net._client = make_client(base_url, proxies=proxies, cookies=cookies, **client_options)
+        response = await net.request("GET", "/api/user/session")
         response.raise_for_status()
-        json_data = json.loads(response.text)
+        json_data = json.loads(response.content)
         if not json_data:
+            await net.aclose()
             raise CookieExpired("cookie 无效或已经过期，请尝试使用其它登录方式进行登录。")
-        result = cls.parse_obj(json_data | {"cookies": cookies})
-        client.cookies = cookies
-        result._client = client
+        result = cls.parse_obj(json_data | {"cookies": cookies, "base_url": base_url})
+        result._client = net.client
         return result
 
-    def my(self) -> My:
-        """获取已上传的 torrent"""
-        response = self.get("/api/torrent/my")
+    @classmethod
+    def from_session(cls, user: dict, cookies: dict, proxies: dict = None,
+                     base_url: URL = BANGUMI_MOE_HOST, **client_options) -> Self:
+        """使用保存的用户信息和 cookies 创建客户端，不发送任何请求
+
+        会话是否仍然有效需要再通过 `session` 确认。
+        """
+        cookies = Cookies(cookies)
+        result = cls.parse_obj(user | {"cookies": cookies, "base_url": base_url})
+        result._client = make_client(base_url, proxies=proxies, cookies=cookies, **client_options)
+        return result
+
+    def dump_cookies(self) -> dict:
+        """当前会话的 cookies，可以传给 `login_with_cookies`"""
+        return {cookie.name: cookie.value for cookie in self.client.cookies.jar}
+
+    def dump_user(self) -> dict:
+        """当前用户的信息，可以传给 `from_session`"""
+        return self.dict(by_alias=True, exclude={"cookies", "base_url"})
+
+    async def session(self) -> dict:
+        """获取当前会话的用户信息，会话失效时为空"""
+        response = await self.request("GET", "/api/user/session")
         response.raise_for_status()
-        return My.parse_raw(response.text)
+        return json.loads(response.content)
 
-    def my_teams(self) -> List[MyTeam]:
+    async def my(self, page: int = 1, lazy: bool = False) -> Union[My, LazyMy]:
+        """获取已上传的 torrent 的第 `page` 页，`lazy` 时返回只在访问时校验字段的视图"""
+        response = await self.request("GET", "/api/torrent/my", params={"p": page})
+        response.raise_for_status()
+        return (LazyMy if lazy else My).parse_obj(json.loads(response.content))
+
+    async def iter_my(self, concurrency: int = HISTORY.CONCURRENCY,
+                      lazy: bool = False, start: int = 1) -> AsyncIterator[Union[My, LazyMy]]:
+        """从第 `start` 页开始按顺序逐页返回已上传的 torrent，每次并发获取 `concurrency` 页
+
+        调用方停止迭代后不会再请求后面的页。
+        """
+        first = await self.my(start, lazy)
+        yield first
+        page = start + 1
+        while page <= first.page_count:
+            window = range(page, min(page + concurrency, first.page_count + 1))
+            for result in await asyncio.gather(*(self.my(p, lazy) for p in window)):
+                yield result
+            page = window.stop
+
+    async def my_teams(self) -> List[MyTeam]:
         """获取我的team"""
         # noinspection SpellCheckingInspection
-        response = self.get("/api/team/myteam")
-        response.raise_for_status()
         my_teams = []
-        for json_data in json.loads(response.text):
+        for json_data in await self.request_json(
+            "GET", "/api/team/myteam", ttl=CACHE.TTL.MY_TEAMS, cache_key=f"{self.id} myteam"
+        ):
             my_teams.append(MyTeam.parse_obj(json_data))
+        if not my_teams:
+            # cookie 失效时服务器也可能返回空列表，不能缓存
+            self.forget_my_teams()
         return my_teams
 
-    def upload_torrent(self, path: StrOrPath, team_id: Optional[str]=None) -> UploadResponse:
-        """上传指定路径的种子文件"""
+    def forget_my_teams(self) -> None:
+        """删除缓存的所属团队"""
+        self.client.cache.delete(f"{self.id} myteam")
+
+    async def upload_torrent(
+        self,
+        path: StrOrPath,
+        team_id: Optional[str]=None,
+        on_progress: Optional[ProgressCallback] = None,
+        deadline: Optional[float] = PUBLISH.UPLOAD_DEADLINE,
+        cancel: Optional[threading.Event] = None,
+        lazy: bool = False,
+    ) -> Union[UploadResponse, LazyUploadResponse]:
+        """上传指定路径的种子文件
+
+        文件按块流式发送并通过 `on_progress` 报告进度，上传结束后文件一定会被关闭。
+        超过 `deadline` 秒未完成时抛出 `UploadTimeout`，`cancel` 被设置时抛出 `UploadCancelled`。
+        `lazy` 时返回只在访问时校验字段的视图，匹配历史发布时只需要少数字段。
+        """
         path = PROJECT_ROOT.joinpath(path).resolve()
         if not path.exists():
             raise FileNotFoundError(f"种子文件不存在：{path}")
         data = None
         if team_id:
             data = {"team_id": team_id}
-        response = self.post(
-            "/api/v2/torrent/upload", data=data, files={"file": path.open("rb")}, timeout=None
-        )
+        with path.open("rb") as file:
+            reader = ProgressReader(file, on_progress, cancel)
+            try:
+                response = await asyncio.wait_for(
+                    self.request(
+                        "POST",
+                        "/api/v2/torrent/upload",
+                        data=data,
+                        files={"file": (path.name, reader, "application/x-bittorrent")},
+                        timeout=Timeout(UPLOAD_TIMEOUT, connect=NET.CONNECT_TIMEOUT),
+                    ),
+                    deadline,
+                )
+            except asyncio.TimeoutError:
+                raise UploadTimeout(deadline) from None
         response.raise_for_status()
-        response_obj = BangumiResponse.parse_raw(response.text)
-        if not response_obj.success:  # 若上传错误
-            if "torrent same as" in response_obj.message:
+        json_data = json.loads(response.content)
+        if not json_data.get("success"):  # 若上传错误
+            message = json_data.get("message") or ""
+            if "torrent same as" in message:
                 raise TorrentDuplicateError("种子文件重复，无法上传。")
-            raise UploadTorrentException(response_obj.message or "上传遇到未知错误")
-        return UploadResponse.parse_raw(response.text)
+            raise UploadTorrentException(message or "上传遇到未知错误")
+        return (LazyUploadResponse if lazy else UploadResponse).parse_obj(json_data)
 
-    def get_tag_misc(self) -> List[Tag]:
+    async def get_tag_misc(self) -> List[Tag]:
         """获取类型标签"""
-        response = self.get("/api/tag/misc")
-        response.raise_for_status()
-        json_data = json.loads(response.text)
+        json_data = await self.request_json("GET", "/api/tag/misc", ttl=CACHE.TTL.TAG_MISC)
         return [Tag.parse_obj(i) for i in json_data]
 
-    def suggest(self, query: str) -> List[Tag]:
+    async def suggest(self, query: str) -> List[Tag]:
         """通过 query 获取建议添加的标签"""
-        response = self.post("/api/tag/suggest", json={"query": query})
-        response.raise_for_status()
-        json_data = json.loads(response.text)
+        json_data = await self.request_json(
+            "POST", "/api/tag/suggest", json={"query": query}, ttl=CACHE.TTL.SUGGEST
+        )
         return [Tag.parse_obj(i) for i in json_data]
 
     # noinspection SpellCheckingInspection
-    def publish(
+    async def publish(
         self,
         category_tag_id: str,
         file_id: str,
@@ -180,8 +239,9 @@ class Bangumi(Uploader, Net):
         tags: List[Union[str, Tag]] = None,
         btskey: Optional[str] = '',
         teamsync: Optional[bool] = False,
+        deadline: Optional[float] = PUBLISH.PUBLISH_DEADLINE,
     ) -> Torrent:
-        """发布种子"""
+        """发布种子，超过 `deadline` 秒未完成时抛出 `PublishTimeout`"""
         tags = tags or []
         tags = [(i.id if isinstance(i, Tag) else i) for i in tags]
 
@@ -201,13 +261,106 @@ class Bangumi(Uploader, Net):
         if teamsync:
             jsondata["teamsync"] = '1'
 
-        response = self.post(
-            "/api/torrent/add",
-            json=jsondata,
-            timeout=None
-        )
+        try:
+            response = await asyncio.wait_for(
+                self.request(
+                    "POST",
+                    "/api/torrent/add",
+                    json=jsondata,
+                    timeout=Timeout(UPLOAD_TIMEOUT, connect=NET.CONNECT_TIMEOUT),
+                ),
+                deadline,
+            )
+        except asyncio.TimeoutError:
+            raise PublishTimeout(deadline) from None
         response.raise_for_status()
-        response_obj = BangumiResponse.parse_raw(response.text)
-        if not response_obj.success:  # 若发布错误
-            raise PublishFailed("发布错误" + ((": " + response_obj.message) or ""))
-        return Torrent.parse_obj(response_obj.__dict__["torrent"])
+        json_data = json.loads(response.content)
+        if not json_data.get("success"):  # 若发布错误
+            message = json_data.get("message")
+            raise PublishFailed("发布错误" + (": " + message if message else ""))
+        return Torrent.parse_obj(json_data["torrent"])
+
+
+class Bangumi(AsyncBangumi, Net):
+    """萌番组客户端（同步）
+
+    每个方法都只是在共享的后台事件循环中运行 `AsyncBangumi` 的同名协程。
+    """
+
+    @staticmethod
+    def test_connection(proxies: dict, url: URL, **client_options) -> bool:
+        return run_sync(AsyncBangumi.test_connection(proxies, url, **client_options))
+
+    @classmethod
+    def login_with_password(cls, username: str, password: str, proxies: dict = None,
+                            base_url: URL = BANGUMI_MOE_HOST, **client_options) -> Self:
+        """使用用户名和密码来登录"""
+        return run_sync(super().login_with_password(username, password, proxies, base_url, **client_options))
+
+    @classmethod
+    def login_with_cookies(cls, cookies: Union[StrOrPath, dict], proxies: dict=None,
+                           base_url: URL = BANGUMI_MOE_HOST, **client_options) -> Self:
+        """使用保存的cookies来登录"""
+        return run_sync(super().login_with_cookies(cookies, proxies, base_url, **client_options))
+
+    def as_async(self) -> AsyncBangumi:
+        """返回共享同一个连接池的异步客户端，其协程须通过 `utils.aio.submit` 在后台事件循环中运行"""
+        result = AsyncBangumi.construct(self.__fields_set__, **self.__dict__)
+        result._client = self.client
+        return result
+
+    def session(self) -> dict:
+        """获取当前会话的用户信息，会话失效时为空"""
+        return run_sync(super().session())
+
+    def my(self, page: int = 1, lazy: bool = False) -> Union[My, LazyMy]:
+        """获取已上传的 torrent 的第 `page` 页"""
+        return run_sync(super().my(page, lazy))
+
+    def my_all(self, concurrency: int = HISTORY.CONCURRENCY) -> List[Torrent]:
+        """获取全部已上传的 torrent"""
+        async def collect() -> List[Torrent]:
+            return [t async for page in super(Bangumi, self).iter_my(concurrency) for t in page.torrents]
+        return run_sync(collect())
+
+    def my_teams(self) -> List[MyTeam]:
+        """获取我的team"""
+        return run_sync(super().my_teams())
+
+    def upload_torrent(
+        self,
+        path: StrOrPath,
+        team_id: Optional[str]=None,
+        on_progress: Optional[ProgressCallback] = None,
+        deadline: Optional[float] = PUBLISH.UPLOAD_DEADLINE,
+        cancel: Optional[threading.Event] = None,
+        lazy: bool = False,
+    ) -> Union[UploadResponse, LazyUploadResponse]:
+        """上传指定路径的种子文件"""
+        return run_sync(super().upload_torrent(path, team_id, on_progress, deadline, cancel, lazy))
+
+    def get_tag_misc(self) -> List[Tag]:
+        """获取类型标签"""
+        return run_sync(super().get_tag_misc())
+
+    def suggest(self, query: str) -> List[Tag]:
+        """通过 query 获取建议添加的标签"""
+        return run_sync(super().suggest(query))
+
+    # noinspection SpellCheckingInspection
+    def publish(
+        self,
+        category_tag_id: str,
+        file_id: str,
+        title: str,
+        introduction: str,
+        team_id: str,
+        tags: List[Union[str, Tag]] = None,
+        btskey: Optional[str] = '',
+        teamsync: Optional[bool] = False,
+        deadline: Optional[float] = PUBLISH.PUBLISH_DEADLINE,
+    ) -> Torrent:
+        """发布种子"""
+        return run_sync(super().publish(
+            category_tag_id, file_id, title, introduction, team_id, tags, btskey, teamsync, deadline
+        ))
@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
 
 class ApplicationException(Exception):
@@ -25,6 +25,22 @@ class TorrentDuplicateError(UploadTorrentException):
     """种子重复"""
 
 
+class UploadCancelled(UploadTorrentException):
+    """上传已取消"""
+    def __init__(self):
+        super().__init__('上传已取消')
+
+
+class UploadTimeout(UploadTorrentException):
+    """上传超时"""
+    def __init__(self, deadline: float):
+        super().__init__(f'上传超过 {deadline} 秒仍未完成')
+
+
+class MakeTorrentFailed(ApplicationException):
+    """制作种子失败"""
+
+
 class PredictionNotFoundInResponse(ApplicationException):
     """没有在上传种子的响应中找到预测标题"""
     def __init__(self):
@@ -33,14 +49,38 @@ class PredictionNotFoundInResponse(ApplicationException):
 
 class BestPredictionNotFound(ApplicationException):
     """未找到最匹配的预测标题"""
-    def __init__(self):
-        super().__init__('未找到最匹配的预测标题')
+    def __init__(self, confidence: Optional[float] = None):
+        self.confidence = confidence
+        if confidence is None:
+            super().__init__('未找到最匹配的预测标题')
+        else:
+            super().__init__(f'未找到最匹配的预测标题（最高相似度 {confidence:.2f}）')
 
 
 class PublishFailed(ApplicationException):
     """发布失败"""
 
 
+class PublishTimeout(PublishFailed):
+    """发布超时，服务器可能已经发布成功"""
+    def __init__(self, deadline: float):
+        super().__init__(f'发布超过 {deadline} 秒仍未完成')
+
+
+class TagNotFound(ApplicationException):
+    """没有找到名称对应的标签"""
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        super().__init__('未找到标签：' + '; '.join(self.names))
+
+
+class CircuitOpenError(ApplicationException):
+    """服务器连续出错，熔断器打开"""
+    def __init__(self, remaining: float):
+        self.remaining = remaining
+        super().__init__(f'萌番组暂时无法访问，请在 {remaining:.0f} 秒后重试')
+
+
 class GuiException(Exception):
     ...
 
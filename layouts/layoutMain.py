@@ -125,9 +125,12 @@ class Ui_MainWindow(object):
         MainWindow.setMenuBar(self.menubar)
         self.actShowLog = QtWidgets.QAction(MainWindow)
         self.actShowLog.setObjectName("actShowLog")
+        self.actMetrics = QtWidgets.QAction(MainWindow)
+        self.actMetrics.setObjectName("actMetrics")
         self.actSettings = QtWidgets.QAction(MainWindow)
         self.actSettings.setObjectName("actSettings")
         self.menu.addAction(self.actShowLog)
+        self.menu.addAction(self.actMetrics)
         self.menu_2.addAction(self.actSettings)
         self.menubar.addAction(self.menu_2.menuAction())
         self.menubar.addAction(self.menu.menuAction())
@@ -151,4 +154,5 @@ class Ui_MainWindow(object):
         self.menu.setTitle(_translate("MainWindow", "帮助"))
         self.menu_2.setTitle(_translate("MainWindow", "选项"))
         self.actShowLog.setText(_translate("MainWindow", "查看日志..."))
+        self.actMetrics.setText(_translate("MainWindow", "网络统计..."))
         self.actSettings.setText(_translate("MainWindow", "设置"))
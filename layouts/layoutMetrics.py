@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'layouts\layoutMetrics.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.7
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Metrics(object):
+    def setupUi(self, Metrics):
+        Metrics.setObjectName("Metrics")
+        Metrics.resize(720, 480)
+        self.verticalLayout = QtWidgets.QVBoxLayout(Metrics)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.labConn = QtWidgets.QLabel(Metrics)
+        self.labConn.setObjectName("labConn")
+        self.verticalLayout.addWidget(self.labConn)
+        self.txtMetrics = QtWidgets.QPlainTextEdit(Metrics)
+        self.txtMetrics.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.txtMetrics.setReadOnly(True)
+        self.txtMetrics.setObjectName("txtMetrics")
+        self.verticalLayout.addWidget(self.txtMetrics)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.btnRefresh = QtWidgets.QPushButton(Metrics)
+        self.btnRefresh.setObjectName("btnRefresh")
+        self.horizontalLayout.addWidget(self.btnRefresh)
+        self.btnClear = QtWidgets.QPushButton(Metrics)
+        self.btnClear.setObjectName("btnClear")
+        self.horizontalLayout.addWidget(self.btnClear)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.btnExportJson = QtWidgets.QPushButton(Metrics)
+        self.btnExportJson.setObjectName("btnExportJson")
+        self.horizontalLayout.addWidget(self.btnExportJson)
+        self.btnExportProm = QtWidgets.QPushButton(Metrics)
+        self.btnExportProm.setObjectName("btnExportProm")
+        self.horizontalLayout.addWidget(self.btnExportProm)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.retranslateUi(Metrics)
+        QtCore.QMetaObject.connectSlotsByName(Metrics)
+
+    def retranslateUi(self, Metrics):
+        _translate = QtCore.QCoreApplication.translate
+        Metrics.setWindowTitle(_translate("Metrics", "网络统计"))
+        self.labConn.setText(_translate("Metrics", "连接："))
+        self.btnRefresh.setText(_translate("Metrics", "刷新"))
+        self.btnClear.setText(_translate("Metrics", "清空"))
+        self.btnExportJson.setText(_translate("Metrics", "导出 JSON..."))
+        self.btnExportProm.setText(_translate("Metrics", "导出 Prometheus..."))
@@ -1,5 +1,4 @@
 from pydantic import BaseModel as PydanticBaseModel
-from typing_extensions import Self
 
 from utils import jsonlib as json
 
@@ -12,9 +11,7 @@ class BaseConfig(object):
 
 
 class BaseModel(PydanticBaseModel):
-    def __new__(cls, *args, **kwargs) -> Self:
-        cls.update_forward_refs()
-        return super(BaseModel, cls).__new__(cls)
+    """带有前向引用的模型须在模块末尾调用一次 `update_forward_refs`"""
 
     class Config(BaseConfig, PydanticBaseModel.Config):
         pass
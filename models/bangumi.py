@@ -113,6 +113,9 @@ class Torrent(BaseModel):
     category_tag: Optional[Tag]
 
 
+UploadResponse.update_forward_refs()
+
+
 class My(BaseModel):
     torrents: List[Torrent]
     page_count: int
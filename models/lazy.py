@@ -0,0 +1,91 @@
+from typing import Any, ClassVar, Generic, Type, TypeVar
+
+from pydantic import ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+
+from models import BaseModel
+from models.bangumi import My, Torrent, UploadResponse
+
+__all__ = ["LazyModel", "LazyTorrent", "LazyUploadResponse", "LazyMy"]
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class LazyModel(Generic[M]):
+    """已解码 json 的惰性模型视图
+
+    只有访问到的字段才会按 `__model__` 的定义校验并缓存，其余字段保持原样；
+    `__lazy__` 中列出的列表字段，其元素同样包装为惰性视图。
+    需要完整模型时调用 `materialize`。
+    """
+
+    __model__: ClassVar[Type[BaseModel]]
+    __lazy__: ClassVar[dict[str, Type["LazyModel"]]] = {}
+
+    __slots__ = "_raw", "_cache"
+
+    def __init__(self, raw: dict):
+        self._raw = raw
+        self._cache = {}  # type: dict[str, Any]
+
+    @classmethod
+    def parse_obj(cls, obj: dict) -> "LazyModel[M]":
+        return cls(obj)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        field = self.__model__.__fields__.get(name)
+        if field is None:
+            # 模型上定义的 property 也可以通过视图使用
+            attr = getattr(self.__model__, name, None)
+            if isinstance(attr, property):
+                return attr.fget(self)
+            raise AttributeError(f"{self.__model__.__name__} 没有字段 {name}")
+        if field.alias not in self._raw:
+            if field.required:
+                raise ValidationError([ErrorWrapper(MissingError(), loc=field.alias)], self.__model__)
+            value = field.get_default()
+        elif (view := self.__lazy__.get(name)) is not None:
+            value = [view(item) for item in self._raw[field.alias]]
+        else:
+            value, errors = field.validate(self._raw[field.alias], {}, loc=field.alias, cls=self.__model__)
+            if errors:
+                raise ValidationError([errors], self.__model__)
+        self._cache[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self._cache.items())}, ...)"
+
+    def materialize(self) -> M:
+        """完整校验，返回普通模型"""
+        return self.__model__.parse_obj(self._raw)
+
+    def dict(self, *, by_alias: bool = False) -> dict:
+        """`by_alias` 时直接返回原始数据的浅拷贝"""
+        if by_alias:
+            return dict(self._raw)
+        return self.materialize().dict()
+
+
+class LazyTorrent(LazyModel[Torrent]):
+    __model__ = Torrent
+    __slots__ = ()
+
+
+class LazyUploadResponse(LazyModel[UploadResponse]):
+    __model__ = UploadResponse
+    __lazy__ = {"torrents": LazyTorrent}
+    __slots__ = ()
+
+
+class LazyMy(LazyModel[My]):
+    __model__ = My
+    __lazy__ = {"torrents": LazyTorrent}
+    __slots__ = ()
@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.mock_server import TEAM, MockBangumiServer
+from errors import BestPredictionNotFound
+from models.bangumi import MyTeam, UploadResponse
+from utils.bangumi import PublishInfo
+
+TITLE = '[织梦字幕组][电锯人 Chainsaw Man][04集][AVC][简日双语][{}]'
+
+
+def upload_response(title: str) -> UploadResponse:
+    server = MockBangumiServer()
+    return UploadResponse.parse_obj({
+        'success': True, 'file_id': '0' * 24, 'content': [], 'torrents': server.predictions_for(title),
+    })
+
+
+def test_auto_publish_requires_same_resolution():
+    resp = upload_response(TITLE.format('1080P'))
+    info = PublishInfo(MyTeam.parse_obj(TEAM), resp, TITLE.format('720P'))
+    with pytest.raises(BestPredictionNotFound):
+        info.loadInfoFromBestPrediction(resp, allow_edit=False)
+    assert info.matched_torrent is None
+
+
+def test_auto_publish_same_series_and_resolution():
+    resp = upload_response(TITLE.format('1080P'))
+    info = PublishInfo(MyTeam.parse_obj(TEAM), resp, TITLE.format('1080P'))
+    info.loadInfoFromBestPrediction(resp, allow_edit=False)
+    assert info.matched_torrent.title == TITLE.format('1080P').replace('04集', '03集')
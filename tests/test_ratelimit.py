@@ -0,0 +1,28 @@
+import asyncio
+import time
+
+from utils.ratelimit import TokenBucket
+
+
+def test_cancelled_slot_is_not_shared():
+    async def main():
+        bucket = TokenBucket(10.0, 1)
+        start = time.monotonic()
+        fired = []
+
+        async def request(name):
+            await bucket.acquire()
+            fired.append((name, time.monotonic() - start))
+
+        await request('a')
+        b = asyncio.create_task(request('b'))
+        c = asyncio.create_task(request('c'))
+        await asyncio.sleep(0.01)
+        b.cancel()
+        # d 使用 b 留下的空位，不与 c 同时发出
+        await asyncio.gather(c, request('d'), return_exceptions=True)
+        return fired
+
+    fired = dict(asyncio.run(main()))
+    assert list(fired) == ['a', 'd', 'c']
+    assert fired['c'] - fired['d'] >= 0.09
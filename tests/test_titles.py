@@ -0,0 +1,81 @@
+from benchmarks.mock_server import MockBangumiServer
+from models.bangumi import Torrent
+from utils.history import HistoryStore
+from utils.predict import Predictor
+from utils.releasename import parse_release, retitle
+from utils.titles import TitleSynthesizer
+
+TEMPLATE = '[织梦字幕组][电锯人 Chainsaw Man][03集][AVC][简日双语][1080P]'
+
+
+def make_synthesizer(tmp_path, titles):
+    """`titles` 中越靠前的发布时间越晚"""
+    server = MockBangumiServer()
+    store = HistoryStore(tmp_path / 'history.db')
+    store.add(Torrent.parse_obj(server.make_torrent(title, i)) for i, title in enumerate(titles))
+    return TitleSynthesizer(Predictor(store)), store
+
+
+def test_retitle_keeps_template_tags():
+    release = parse_release('[织梦字幕组][电锯人][04集]')
+    assert retitle(TEMPLATE, release) == '[织梦字幕组][电锯人 Chainsaw Man][04集][AVC][简日双语][1080P]'
+
+
+def test_retitle_parsed_fields_override_template():
+    release = parse_release('[织梦字幕组][电锯人][04集][HEVC][繁日双语][2160P].mkv')
+    assert retitle(TEMPLATE, release) == '[织梦字幕组][电锯人 Chainsaw Man][04集][HEVC][繁日双语][2160P]'
+    release = parse_release('[织梦字幕组][电锯人][04集][720P]')
+    assert retitle(TEMPLATE, release) == '[织梦字幕组][电锯人 Chainsaw Man][04集][AVC][简日双语][720P]'
+
+
+def test_retitle_appends_fields_missing_from_template():
+    release = parse_release('[织梦字幕组][电锯人][04集][HEVC][1080P]')
+    assert retitle('[织梦字幕组][电锯人 Chainsaw Man][03集]', release) == \
+        '[织梦字幕组][电锯人 Chainsaw Man][04集][HEVC][1080P]'
+
+
+def test_retitle_drops_stale_extras():
+    template = '[V2][织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[30][第十三夜][GB_JP][AVC][1080P]'
+    release = parse_release('[织梦字幕组][与猫共度的夜晚][31][1080P]')
+    assert retitle(template, release) == '[织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[31][GB_JP][AVC][1080P]'
+    release = parse_release('[织梦字幕组][与猫共度的夜晚][31][第十四夜][1080P]')
+    assert retitle(template, release) == \
+        '[织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[31][第十四夜][GB_JP][AVC][1080P]'
+
+    template = '[织梦字幕组]Summer Time Rendering 夏日重现[17][2022.08.05][1080P][GB_JP][AVC]'
+    release = parse_release('[织梦字幕组][夏日重现][18][1080P]')
+    assert retitle(template, release) == '[织梦字幕组]Summer Time Rendering 夏日重现[18][1080P][GB_JP][AVC]'
+    # 模板中没有的放在集数之后
+    release = parse_release('[织梦字幕组][电锯人][04集][总集篇][1080P]')
+    assert retitle(TEMPLATE, release) == '[织梦字幕组][电锯人 Chainsaw Man][04集][总集篇][AVC][简日双语][1080P]'
+
+
+def test_synthesize_uses_same_resolution(tmp_path):
+    synthesizer, store = make_synthesizer(tmp_path, [
+        '[织梦字幕组][电锯人 Chainsaw Man][03集][HEVC][简日双语][720P]',
+        TEMPLATE,
+    ])
+    assert synthesizer.synthesize('[织梦字幕组][电锯人][04集][1080P]') == \
+        '[织梦字幕组][电锯人 Chainsaw Man][04集][AVC][简日双语][1080P]'
+    assert synthesizer.synthesize('[织梦字幕组][电锯人][04集][720P]') == \
+        '[织梦字幕组][电锯人 Chainsaw Man][04集][HEVC][简日双语][720P]'
+    store.close()
+
+
+def test_latest_title_without_resolution(tmp_path):
+    synthesizer, store = make_synthesizer(tmp_path, [TEMPLATE])
+    assert synthesizer.predictor.latest_title('[织梦字幕组][电锯人][04集]') is None
+    assert synthesizer.predictor.latest_title('[织梦字幕组][电锯人][04集][1080P]') == TEMPLATE
+    assert synthesizer.synthesize('[织梦字幕组][电锯人][04集]') == '[织梦字幕组][电锯人][04集]'
+    store.close()
+
+
+def test_predicted_titles_filtered_by_resolution():
+    synthesizer = TitleSynthesizer()
+    predicted = [
+        '[织梦字幕组][电锯人 Chainsaw Man][03集][AVC][简日双语][720P]',
+        '[织梦字幕组][孤独摇滚 Bocchi the Rock][03集][AVC][简日双语][1080P]',
+        TEMPLATE,
+    ]
+    assert synthesizer.templates('[织梦字幕组][电锯人][04集][1080P]', predicted) == [TEMPLATE]
+    assert synthesizer.synthesize('[织梦字幕组][电锯人][04集][2160P]', predicted) == '[织梦字幕组][电锯人][04集][2160P]'
@@ -0,0 +1,36 @@
+import pytest
+from httpx import URL
+
+from benchmarks.mock_server import TEAM_NAME, MockBangumiServer
+from core.client import Bangumi
+from errors import CookieExpired
+from utils.aio import run_sync
+from utils.warmup import warm_up
+
+
+@pytest.fixture
+def server():
+    with MockBangumiServer() as server:
+        yield server
+
+
+def test_expired_cookies_do_not_cache_teams(server):
+    client = Bangumi.login_with_password('mock', 'mock', base_url=URL(server.url))
+    cookies = dict(client.client.cookies)
+    client.client.cookies.clear()
+    with pytest.raises(CookieExpired):
+        run_sync(warm_up(client.as_async(), TEAM_NAME))
+    assert client.client.cache.get(f'{client.id} myteam') is None
+
+    # 重新登录后不会读到失效时的空列表
+    client.client.cookies.update(cookies)
+    assert [team.name for team in client.my_teams()] == [TEAM_NAME]
+    run_sync(client.aclose())
+
+
+def test_empty_team_list_is_not_cached(server):
+    client = Bangumi.login_with_password('mock', 'mock', base_url=URL(server.url))
+    client.client.cookies.clear()
+    assert client.my_teams() == []
+    assert client.client.cache.get(f'{client.id} myteam') is None
+    run_sync(client.aclose())
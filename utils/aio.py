@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional, TypeVar
+
+from utils._singleton import Singleton
+
+__all__ = ["EventLoopThread", "run_sync", "submit"]
+
+T = TypeVar("T")
+
+
+class EventLoopThread(Singleton):
+    """在后台守护线程中运行的共享事件循环
+
+    同步接口通过它来驱动异步客户端，保证同一个 AsyncClient 始终在同一个事件循环中使用。
+    """
+
+    loop: asyncio.AbstractEventLoop
+    thread: threading.Thread
+
+    def __init__(self):
+        with self._lock:
+            if getattr(self, "thread", None) is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self._run, name="EventLoopThread", daemon=True
+            )
+            self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop(self) -> bool:
+        """当前线程是否就是事件循环所在线程"""
+        return threading.current_thread() is self.thread
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        """提交协程，立即返回 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """提交协程并阻塞等待其结果"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("不能在事件循环线程中同步等待协程")
+        return self.submit(coro).result(timeout)
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> "Future[T]":
+    return EventLoopThread().submit(coro)
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    return EventLoopThread().run(coro, timeout)
@@ -1,12 +1,14 @@
-from typing import Optional, Iterable
-
-from bs4 import BeautifulSoup
+from typing import Optional, Iterable, Union
 
 from core.client import Bangumi
-from errors import AccountTeamError, PredictionNotFoundInResponse, BestPredictionNotFound
+from errors import AccountTeamError, PredictionNotFoundInResponse, BestPredictionNotFound, TagNotFound
 from models.bangumi import MyTeam, UploadResponse, Tag, Torrent
-from utils.const import TEAM_NAME
-from utils.gui.helpers import parse_vidname
+from utils.const import PREDICT, TEAM_NAME
+from utils.intro import INTROS
+from utils.predict import Prediction, Predictor
+from utils.releasename import parse_release
+from utils.tags import TagCatalog, TagRecord
+from utils.titles import TitleSynthesizer
 
 
 def assert_team(client: Bangumi, team_name: str=TEAM_NAME) -> MyTeam:
@@ -18,52 +20,119 @@ def assert_team(client: Bangumi, team_name: str=TEAM_NAME) -> MyTeam:
 
 class PublishInfo:
     """Store information needed for publishing torrent"""
-    def __init__(self, myteam: MyTeam, resp: UploadResponse, title: str):
-        self.category_tag = None  # type: Optional[Tag]
-        self.file_id = resp.file_id
+    def __init__(self, myteam: MyTeam, resp: Optional[UploadResponse], title: str,
+                 catalog: Optional[TagCatalog] = None, predictor: Optional[Predictor] = None,
+                 pretty_intro: bool = False):
+        self.category_tag = None  # type: Optional[Union[Tag, TagRecord]]
+        self.file_id = resp.file_id if resp is not None else None  # 上传完成前为 None
         self.title = title
         self.intro_html = ''  # html
+        self.intro_source = None  # type: Optional[str]  # 简介来源的种子 id，用于缓存
+        self.pretty_intro = pretty_intro  # 需要编辑时格式化简介，自动发布时保持原样
         self.myteam = myteam
-        self.tags = []  # type: list[Tag]
+        self.tags = []  # type: list[Union[Tag, TagRecord]]
         self.teamsync = True
         self.matched_torrent = None  # type: Optional[Torrent]
+        self.confidence = 0.0  # matched_torrent 与标题的相似度
+        self.catalog = catalog  # 用于按名称查找标签
+        self.predictor = predictor if predictor is not None else Predictor()  # 没有给出时只在响应中查找
+        self.titles = TitleSynthesizer(self.predictor)
 
     def loadInfoFromBestPrediction(self, resp: UploadResponse, allow_edit: bool):
-        if not resp.torrents:
+        # 先按系列的发布历史和服务器预测的标题生成规范的标题，再在响应中的预测种子和发布历史中按相似度查找
+        self.title = self.titles.synthesize(self.title, resp.predicted_titles)
+        torrents = resp.torrents or []
+        if allow_edit:
+            prediction = self.predictor.best(self.title, torrents)
+        else:
+            # 自动发布只使用番名和分辨率都相同的种子：番名只是部分相同（例如其他季）或分辨率不同时相似度也可能超过阈值
+            predictions = self.predictor.rank(self.title, torrents)
+            release = parse_release(self.title)
+            prediction = next(
+                (p for p in predictions
+                 if release.name and (r := parse_release(p.torrent.title)).name == release.name
+                 and r.resolution == release.resolution),
+                None,
+            )
+            if prediction is None and predictions:
+                raise BestPredictionNotFound(predictions[0].confidence)
+        if prediction is None:
             if allow_edit:
                 return
-            else:
+            elif not resp.torrents:
                 raise PredictionNotFoundInResponse()
-        # try to find the best matched prediction based on history uploads
-        # default is the first
-        torrent = resp.torrents[0]
-        # 使用番名+清晰度匹配
-        name, resl = parse_vidname(self.title)
-        for t in resp.torrents:
-            name2, resl2 = parse_vidname(t.title)
-            if name == name2 and resl == resl2:
-                torrent = t
-                self.matched_torrent = t
-                break
+            else:
+                raise BestPredictionNotFound()
 
         # best prediction not found
-        if not self.matched_torrent:
+        if prediction.confidence < PREDICT.MIN_CONFIDENCE:
             if allow_edit:
                 return
             else:
-                raise BestPredictionNotFound()
+                raise BestPredictionNotFound(prediction.confidence)
+        self.loadInfoFromPrediction(prediction)
+
+    def loadInfoFromTemplate(self) -> bool:
+        """不上传种子，只按本地发布历史载入发布模板，没有模板时返回 False"""
+        if (prediction := self.predictor.template(self.title)) is None:
+            return False
+        self.loadInfoFromPrediction(prediction)
+        return True
+
+    def setUploadResponse(self, resp: UploadResponse, allow_edit: bool) -> Optional[str]:
+        """上传完成后调用
+
+        还没有载入模板时按 `loadInfoFromBestPrediction` 载入；已经载入本地模板时，服务器的预测只用来核对，
+        分类或标签不一致时返回说明。
+        """
+        self.file_id = resp.file_id
+        if self.matched_torrent is None:
+            self.loadInfoFromBestPrediction(resp, allow_edit)
+            return None
+        server = Predictor().best(self.title, resp.torrents or [])
+        if server is None or server.confidence < PREDICT.MIN_CONFIDENCE:
+            return None
+        local = self.matched_torrent
+        if server.torrent.category_tag_id != local.category_tag_id or set(server.torrent.tag_ids) != set(local.tag_ids):
+            return f'服务器预测的种子的分类或标签与本地模板不同：\n{server.torrent.title}'
+        return None
+
+    def loadInfoFromPrediction(self, prediction: Prediction):
+        torrent = self.matched_torrent = prediction.torrent
+        self.confidence = prediction.confidence
 
         self.category_tag = torrent.category_tag
-        self.intro_html = BeautifulSoup(torrent.introduction, 'html.parser').prettify()
-        self.tags = torrent.tags
+        self.intro_source = torrent.id
+        if self.pretty_intro:
+            self.intro_html = INTROS.prettify(torrent.introduction, torrent.id)
+        else:
+            self.intro_html = torrent.introduction
+        self.tags = torrent.tags or []
+        if self.catalog is not None:
+            self.catalog.add(self.tags)
+            if self.category_tag:
+                self.catalog.add([self.category_tag])
 
     def set_category_by_name(self, category: str):
-        # TODO find category ids by name
-        ...
+        """按名称（或译名、同义词）设置分类"""
+        record = self.catalog.get(category, 'misc') if self.catalog is not None else None
+        if record is None:
+            raise TagNotFound([category])
+        self.category_tag = record
 
     def set_tags_by_name(self, tagnames: Iterable[str]):
-        # TODO get tag ids by name (split by ';' then strip space)
-        ...
+        """按名称（或译名、同义词）设置标签，找不到的名称一起通过 `TagNotFound` 报告"""
+        tags, missing = [], []
+        for name in tagnames:
+            if not (name := name.strip()):
+                continue
+            if self.catalog is not None and (record := self.catalog.get(name)) is not None:
+                tags.append(record)
+            else:
+                missing.append(name)
+        if missing:
+            raise TagNotFound(missing)
+        self.tags = tags
 
     def set_team_by_name(self, team: str):
         # TODO get team id by name
@@ -89,7 +158,7 @@ class PublishInfo:
             category_tag_id=self.get_category_id(),
             file_id=self.file_id,
             title=self.title,
-            introduction=self.intro_html,
+            introduction=INTROS.minify(self.intro_html, self.intro_source),
             team_id=self.myteam.id,
             tags=self.get_tag_ids(),
             teamsync=self.teamsync,
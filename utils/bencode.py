@@ -0,0 +1,120 @@
+import hashlib
+from pathlib import Path
+from typing import Any, Union
+
+__all__ = ["BencodeError", "encode", "decode", "info_hash", "torrent_info_hash"]
+
+BValue = Union[int, bytes, list, dict]
+
+
+class BencodeError(ValueError):
+    """不是合法的 bencode 数据"""
+
+
+def _encode(value: Any, out: list[bytes]):
+    if isinstance(value, bool):
+        raise BencodeError('bencode 不支持布尔值')
+    if isinstance(value, int):
+        out.append(b'i%de' % value)
+    elif isinstance(value, (bytes, bytearray, memoryview, str)):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        out.append(b'%d:' % len(value))
+        out.append(bytes(value))
+    elif isinstance(value, (list, tuple)):
+        out.append(b'l')
+        for item in value:
+            _encode(item, out)
+        out.append(b'e')
+    elif isinstance(value, dict):
+        # 键按原始字节排序
+        items = sorted((k.encode('utf-8') if isinstance(k, str) else bytes(k), v) for k, v in value.items())
+        out.append(b'd')
+        for key, item in items:
+            _encode(key, out)
+            _encode(item, out)
+        out.append(b'e')
+    else:
+        raise BencodeError(f'bencode 不支持类型 {type(value).__name__}')
+
+
+def encode(value: Any) -> bytes:
+    """编码为 bencode：str 按 UTF-8 编码为字符串，tuple 与 list 相同，字典的键按字节序排序"""
+    out = []  # type: list[bytes]
+    _encode(value, out)
+    return b''.join(out)
+
+
+def _decode(data: bytes, i: int) -> tuple[BValue, int]:
+    """解析从 `i` 开始的一个值，返回 (值, 结束位置)"""
+    c = data[i]
+    if c == 0x69:  # i<int>e
+        end = data.index(b'e', i)
+        return int(data[i + 1:end]), end + 1
+    if c == 0x6c:  # l...e
+        i += 1
+        result = []
+        while data[i] != 0x65:
+            value, i = _decode(data, i)
+            result.append(value)
+        return result, i + 1
+    if c == 0x64:  # d...e
+        i += 1
+        result = {}
+        while data[i] != 0x65:
+            key, i = _decode(data, i)
+            result[key], i = _decode(data, i)
+        return result, i + 1
+    if 0x30 <= c <= 0x39:  # <len>:<bytes>
+        colon = data.index(b':', i)
+        start = colon + 1
+        end = start + int(data[i:colon])
+        if end > len(data):
+            raise BencodeError(f'第 {i} 字节处的字符串超出数据长度')
+        return data[start:end], end
+    raise BencodeError(f'第 {i} 字节处为非法字符 {chr(c)!r}')
+
+
+def decode(data: bytes) -> Any:
+    """解码 bencode 数据，字符串保持为 bytes"""
+    try:
+        value, end = _decode(data, 0)
+    except IndexError:
+        raise BencodeError('数据意外结束') from None
+    except BencodeError:
+        raise
+    except ValueError as e:
+        raise BencodeError(str(e)) from None
+    if end != len(data):
+        raise BencodeError(f'第 {end} 字节之后有多余的数据')
+    return value
+
+
+def info_hash(data: bytes) -> str:
+    """种子的 info-hash（info 字典原始字节的 SHA-1，小写十六进制）
+
+    直接截取 info 字典的原始字节，不重新编码，因此与客户端和服务器计算的结果一致。
+    """
+    if not data.startswith(b'd'):
+        raise BencodeError('种子文件的顶层不是字典')
+    try:
+        i = 1
+        while data[i] != 0x65:
+            key, i = _decode(data, i)
+            start = i
+            _, i = _decode(data, i)
+            if key == b'info':
+                return hashlib.sha1(data[start:i]).hexdigest()
+    except IndexError:
+        raise BencodeError('数据意外结束') from None
+    except BencodeError:
+        raise
+    except ValueError as e:
+        raise BencodeError(str(e)) from None
+    raise BencodeError('种子文件中没有 info 字典')
+
+
+def torrent_info_hash(path: Union[str, Path]) -> str:
+    """读取 .torrent 文件并计算 info-hash"""
+    with open(path, 'rb') as f:
+        return info_hash(f.read())
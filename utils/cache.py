@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+from utils.const import CACHE
+
+__all__ = ["TTLCache", "DiskCache", "ResponseCache"]
+
+T = TypeVar("T")
+
+
+class TTLCache(Generic[T]):
+    """带过期时间的内存 LRU 缓存"""
+
+    def __init__(self, maxsize: int = CACHE.MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # type: OrderedDict[Hashable, Tuple[float, T]]
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: T, ttl: float, expires: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (expires or time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache(object):
+    """保存在 sqlite 中的缓存，值为 bytes，重启后仍然有效"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY,'
+                'expires REAL NOT NULL,'
+                'value BLOB NOT NULL'
+                ');'
+            )
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        """返回 (过期时间, 值)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT expires, value FROM cache WHERE key = ?;', (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache(key, expires, value) VALUES(?, ?, ?);',
+                (key, time.time() + ttl, value),
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache WHERE key = ?;', (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache;')
+
+    def purge(self):
+        """删除已过期的条目"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache WHERE expires < ?;', (time.time(),))
+
+    def close(self):
+        self._conn.close()
+
+
+class ResponseCache(object):
+    """接口响应缓存：先查内存 LRU，再查可选的磁盘缓存"""
+
+    def __init__(self, path: Optional[Path] = None, maxsize: int = CACHE.MAXSIZE):
+        self.memory = TTLCache[bytes](maxsize)
+        self.disk = DiskCache(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            if item := self.disk.get(key):
+                expires, value = item
+                self.memory.set(key, value, 0, expires)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
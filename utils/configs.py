@@ -2,7 +2,7 @@ from pathlib import Path
 from addict import Dict
 
 import utils.jsonlib as json
-from utils.const import PATHS
+from utils.const import NET, PATHS, PUBLISH
 
 
 def loadConfigs(path: Path) -> Dict:
@@ -18,15 +18,36 @@ def loadConfigs(path: Path) -> Dict:
             bc='',
         ),
         autoMakeTorrent=True,
+        torrent=Dict(
+            engine='native',  # native：内置的多进程制作；bitcomet：调用 exe.bc
+            workers=0,  # 计算哈希的进程数，0 为 CPU 核数
+            announce=[],  # tracker 地址，为空时只使用 DHT
+        ),
         proxies=Dict(
             enabled=False,
             addr='127.0.0.1',
             port='10809'
+        ),
+        net=Dict(
+            maxConnections=NET.MAX_CONNECTIONS,
+            maxKeepalive=NET.MAX_KEEPALIVE_CONNECTIONS,
+            keepaliveExpiry=NET.KEEPALIVE_EXPIRY,
+            http2=NET.HTTP2,
+            retries=NET.RETRIES,
+            backoff=NET.BACKOFF,
+            backoffMax=NET.BACKOFF_MAX,
+            breakerThreshold=NET.BREAKER_THRESHOLD,
+            breakerReset=NET.BREAKER_RESET,
+            diskCache=True,
+            rateLimits=Dict(NET.RATE_LIMITS),
+        ),
+        publish=Dict(
+            concurrency=PUBLISH.CONCURRENCY,
+            uploadDeadline=PUBLISH.UPLOAD_DEADLINE,
         )
     )
     if path.is_file():
-        with path.open('r', encoding='utf8') as f:
-            read = Dict(json.load(f))
+        read = Dict(json.read_file(path))
         conf.update(read)
         conf.root = str(conf.root)
         conf.autoLogin = bool(conf.autoLogin)
@@ -40,8 +61,7 @@ def loadConfigs(path: Path) -> Dict:
 
 
 def saveConfigs(path: Path, conf: Dict):
-    with path.open('w', encoding='utf8') as f:
-        json.dump(conf.to_dict(), f, ensure_ascii=False)
+    json.write_file(conf.to_dict(), path)
 
 
 conf = loadConfigs(PATHS.CONF)
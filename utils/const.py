@@ -18,7 +18,11 @@ PROJECT_ROOT = Path(sys.executable).parent if ISEXE else Path(__file__).parents[
 
 PATHS = Dict(
     DB=PROJECT_ROOT / 'cache.db',  # 缓存数据库
+    HTTP_CACHE=PROJECT_ROOT / 'http_cache.db',  # 接口响应缓存
     CONF=PROJECT_ROOT / 'configs.json',  # 配置文件
+    SESSION=PROJECT_ROOT / 'session.json',  # 保存的登录会话
+    HISTORY=PROJECT_ROOT / 'history.db',  # 已发布种子的本地镜像
+    JOBS=PROJECT_ROOT / 'jobs.db',  # 持久化的发布队列
     ICON=PROJECT_ROOT / 'icon.ico',  # 图标
     LOG=PROJECT_ROOT / 'logs',  # 日志文件
     LOGFILE=PROJECT_ROOT / 'logs' / f"log_{datetime.today().strftime('%Y-%m-%d_%H-%M-%S')}.log",
@@ -53,6 +57,84 @@ RETRY = Dict(
     POLL_MAKEBT=6
 )
 
+NET = Dict(
+    MAX_CONNECTIONS=20,  # 连接池最大连接数
+    MAX_KEEPALIVE_CONNECTIONS=10,  # 保持活动的最大连接数
+    KEEPALIVE_EXPIRY=60.0,  # 空闲连接保持的秒数
+    HTTP2=False,  # 是否启用 HTTP/2（需要安装 h2）
+    CONNECT_TIMEOUT=10.0,  # 建立连接的超时秒数
+    RETRIES=3,  # 最多重试次数
+    BACKOFF=0.5,  # 重试退避的基础秒数
+    BACKOFF_MAX=10.0,  # 重试退避的最长秒数
+    RETRY_STATUSES=(429, 500, 502, 503, 504),  # 需要重试的状态码
+    IDEMPOTENT_PATHS=(  # 可以安全重试的 POST 接口
+        '/api/user/signin',
+        '/api/tag/suggest',
+        '/api/v2/torrent/upload',
+    ),
+    BREAKER_THRESHOLD=5,  # 连续失败多少次后熔断
+    BREAKER_RESET=30.0,  # 熔断多少秒后尝试恢复
+    RATE_LIMITS={  # 各接口的令牌桶限流：每秒请求数 rate，最多连续 burst 个
+        '/api/v2/torrent/upload': Dict(rate=1.0, burst=3),
+        '/api/torrent/add': Dict(rate=0.5, burst=2),
+    },
+)
+"""连接池设置"""
+
+CACHE = Dict(
+    MAXSIZE=256,  # 内存中最多缓存的响应数
+    TTL=Dict(  # 各接口缓存的秒数
+        TAG_MISC=24 * 3600,
+        MY_TEAMS=3600,
+        SUGGEST=6 * 3600,
+    ),
+)
+"""接口响应缓存设置"""
+
+HISTORY = Dict(
+    CONCURRENCY=4,  # 同步发布历史时同时请求的页数
+    IMPORT_BATCH=500,  # 导入 NDJSON 时每次写入数据库的条数
+)
+"""发布历史同步设置"""
+
+PUBLISH = Dict(
+    CONCURRENCY=5,  # 批量发布时同时进行的任务数
+    UPLOAD_DEADLINE=120.0,  # 单个种子上传的最长秒数
+    PUBLISH_DEADLINE=60.0,  # 单次发布请求的最长秒数
+    RESUME_DELAY=10.0,  # 队列因网络问题中断后，首次重试前等待的秒数
+    RESUME_DELAY_MAX=300.0,  # 重试等待的最长秒数
+    CLOCK_SKEW=600.0,  # 查找中断的发布时，允许本机与服务器时间相差的秒数
+    KEEP_DONE=30 * 24 * 3600.0,  # 已完成的任务在队列中保留的秒数
+)
+"""发布设置"""
+
+PREDICT = Dict(
+    MIN_CONFIDENCE=0.75,  # 低于该相似度的候选不会用于自动发布
+    LIMIT=5,  # 排序时返回的候选数
+    WEIGHTS=Dict(  # 各字段在相似度中的权重，合计为 1
+        name=0.65,
+        resolution=0.15,
+        language=0.1,
+        codec=0.05,
+        group=0.05,
+    ),
+)
+"""匹配历史发布的设置"""
+
+INTRO = Dict(
+    CACHE_SIZE=256,  # 缓存的处理后的简介数
+)
+"""发布简介的处理设置"""
+
+TORRENT = Dict(
+    MIN_PIECE=256 * 1024,  # 分块大小的范围，都是 2 的幂
+    MAX_PIECE=16 * 1024 * 1024,
+    TARGET_PIECES=2000,  # 自动选择分块大小时分块数不超过该值（达到最大分块大小时除外）
+    TASK_SIZE=64 * 1024 * 1024,  # 每个进程任务计算哈希的字节数，小于该值的文件不使用进程池
+    CREATED_BY='TorrentUploader',
+)
+"""制作种子的设置"""
+
 
 PAPER_URL_LIST = [
     "https://img30.360buyimg.com/imgzone/jfs/t1/141321/32/30637/399120/635daaaeE1c14939e/d56dc1fb1c06bed4.png",
@@ -0,0 +1,32 @@
+from pathlib import Path
+from typing import Protocol
+
+from errors import TorrentDuplicateError
+from utils.bencode import torrent_info_hash
+
+__all__ = ["InfoHashSource", "InfoHashIndex"]
+
+
+class InfoHashSource(Protocol):
+    def has_info_hash(self, info_hash: str) -> bool:
+        ...
+
+
+class InfoHashIndex(object):
+    """已发布种子的 info-hash 索引，由账户的发布历史和本机的发布队列组成
+
+    在上传前本地判断种子是否重复，不需要任何网络请求。
+    """
+
+    def __init__(self, *sources: InfoHashSource):
+        self.sources = sources
+
+    def __contains__(self, info_hash: str) -> bool:
+        return any(source.has_info_hash(info_hash) for source in self.sources)
+
+    def check(self, path: Path) -> str:
+        """计算种子的 info-hash，已经发布过时抛出 `TorrentDuplicateError`"""
+        info_hash = torrent_info_hash(path)
+        if info_hash in self:
+            raise TorrentDuplicateError(f'种子文件重复（info-hash {info_hash} 已经发布过），无法上传。')
+        return info_hash
@@ -1,4 +1,3 @@
-import re
 import subprocess
 import time
 from contextlib import contextmanager
@@ -6,11 +5,14 @@ from functools import wraps
 from pathlib import Path
 from typing import Iterable
 
-from PyQt5.QtCore import Qt, QThread, QObject
+from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal, pyqtBoundSignal
 from PyQt5.QtWidgets import QApplication, QMessageBox
 
+from errors import MakeTorrentFailed
 from utils.configs import conf
 from utils.const import INTERVAL, RETRY
+from utils.releasename import parse_release
+from utils.torrent import make_torrent as make_native_torrent
 
 
 def setOverrideCursorToWait():
@@ -49,6 +51,14 @@ def exists_bt(vidpath: Path) -> bool:
 
 
 def make_torrent(vidpath: Path, silent: bool):
+    """制作 `<视频>.torrent`，默认使用内置的多进程制作，配置为 bitcomet 时调用 BitComet
+
+    内置制作失败时抛出 `OSError` 或 `MakeTorrentFailed`。
+    """
+    if conf.torrent.engine != 'bitcomet':
+        if not exists_bt(vidpath):
+            make_native_torrent(vidpath, announce=conf.torrent.announce, workers=conf.torrent.workers)
+        return
     cmd = [conf.exe.bc, '-m', str(vidpath)]
     if silent:
         cmd.append('-s')
@@ -83,6 +93,9 @@ def wait_copy_complete(path: Path) -> bool:
 
 
 class TorrentMakerThread(QThread):
+    """在后台依次制作种子，某个文件失败时通过 `failed` 报告并继续制作其余的"""
+    failed = pyqtSignal(str)  # type: pyqtBoundSignal
+
     def __init__(self, parent: QObject, vidpaths: Iterable[Path], silent: bool):
         super().__init__(parent)
         self.vidpaths = vidpaths
@@ -90,50 +103,26 @@ class TorrentMakerThread(QThread):
 
     def run(self) -> None:
         for path in self.vidpaths:
-            if wait_copy_complete(path):
+            if not wait_copy_complete(path):
+                continue
+            try:
                 make_torrent(path, self.silent)
+            except (OSError, MakeTorrentFailed) as e:
+                self.failed.emit(str(path) + '\n' + type(e).__name__ + '\n' + str(e))
 
 
-def parse_vidname(vidname) -> tuple[str, str]:
+def torrent_title(vidpath: Path) -> str:
     '''
-    解析番名、分辨率
+    发布标题：去掉视频文件名的全部后缀
     '''
+    while vidpath.suffix:
+        vidpath = vidpath.with_suffix('')
+    return vidpath.name
+
 
-    # pat1:
-    # [织梦字幕组][哆啦A梦大山补缺集][1997年][1472][AVC][1080P]
-    # [织梦字幕组][电锯人][02集]
-    # pat2:
-    # [织梦字幕组][电锯人 Chainsaw Man][02集][AVC][简日双语][1080P]
-    # [织梦字幕组][间谍过家家 SPY×FAMILY][15集][AVC][简日双语][1080P]
-    # [织梦字幕组][夫妇以上，恋人未满 Fuufu Ijou, Koibito Miman][01集][AVC][简日双语][1080P]
-    # [织梦字幕组][宇崎学妹想要玩 第二季 Uzaki-chan wa Asobita S2][02集][1080P][AVC][简日双语]
-    # [织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[17][第十七夜][GB_JP][AVC][1080P]
-    # [V2][织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[13][第十三夜][GB_JP][AVC][1080P]
-    # [V2][织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[30 - END][第十三夜][GB_JP][AVC][1080P]
-    # pat3:
-    # [V2][织梦字幕组]Summer Time Rendering 夏日重现[17][2022.08.05][1080P][GB_JP][AVC].mp4
-
-    # 解析番名
-    name = ''
-    # 1. 只有中文（以汉字开头和结尾），可以不以[]包围，以[结尾
-    pat1 = re.compile(r'\[织梦字幕组\]\[?\b([\u4e00-\u9fa5][^\]]*[\u4e00-\u9fa5])\b\]?\[')
-    # 2. 前中文（以汉字开头和结尾），后外文（以\w或汉字或假名开头结尾），中间空格隔开，可以不以[]包围，以[结尾
-    pat2 = re.compile(
-        r'\[织梦字幕组\]\[?\b([\u4e00-\u9fa5][^\]]*[\u4e00-\u9fa5])\b \b([\w\u4e00-\u9fa5\u3040-\u309F\u30A0-\u30FF][^\[\]]*[\w\u4e00-\u9fa5\u3040-\u309F\u30A0-\u30FF])\b\]?\[')
-    # 3. 前外文，后中文
-    pat3 = re.compile(
-        r'\[织梦字幕组\]\[?\b([\w\u4e00-\u9fa5\u3040-\u309F\u30A0-\u30FF][^\[\]]*[\w\u4e00-\u9fa5\u3040-\u309F\u30A0-\u30FF])\b \b([\u4e00-\u9fa5][^\]]*[\u4e00-\u9fa5])\b\]?\[')
-
-    if res := pat1.search(vidname):
-        name = res[1]
-    elif res := pat2.search(vidname):
-        name = res[1]
-    elif res := pat3.search(vidname):
-        name = res[1]
-
-    # 解析分辨率
-    resl = ''
-    if res := re.search('1080|720', vidname):
-        resl = res[0]
-
-    return name, resl
+def parse_vidname(vidname) -> tuple[str, str]:
+    '''
+    解析番名、分辨率，完整的解析结果见 `parse_release`
+    '''
+    release = parse_release(vidname)
+    return release.name, release.resolution
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtBoundSignal
+
+from core.client import Bangumi
+from models.bangumi import MyTeam
+from utils.aio import run_sync
+from utils.const import TEAM_NAME
+from utils.history import HistoryStore
+from utils.session import clear_session, load_session, save_session
+from utils.warmup import warm_up
+
+
+class LoginThread(QThread):
+    """在后台登录并预热，主窗口在此期间保持可操作
+
+    优先使用保存的会话，会话失效时再用密码登录。
+    """
+    loggedIn = pyqtSignal(str, Bangumi, MyTeam)  # type: pyqtBoundSignal
+    failed = pyqtSignal(str)  # type: pyqtBoundSignal
+
+    def __init__(self, parent: QObject, username: str, password: str, proxies: Optional[dict], options: dict,
+                 store: Optional[HistoryStore] = None):
+        super().__init__(parent)
+        self.username = username
+        self.password = password
+        self.proxies = proxies
+        self.options = options
+        self.store = store
+
+    def run(self) -> None:
+        if (session := load_session()) and session.username == self.username:
+            client = Bangumi.from_session(session.user.to_dict(), session.cookies.to_dict(), self.proxies,
+                                          **self.options)  # type: Bangumi
+            try:
+                myteam = run_sync(warm_up(client.as_async(), TEAM_NAME, self.store))
+            except Exception as e:
+                print('saved session invalid:', type(e).__name__, e)
+                clear_session()
+                client.close()
+            else:
+                self.loggedIn.emit(self.username, client, myteam)
+                return
+
+        try:
+            client = Bangumi.login_with_password(self.username, self.password, self.proxies,
+                                                 **self.options)  # type: Bangumi
+            myteam = run_sync(warm_up(client.as_async(), TEAM_NAME, self.store))
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            save_session(client, myteam)
+            self.loggedIn.emit(self.username, client, myteam)
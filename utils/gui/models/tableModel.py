@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 from PyQt5.QtCore import QObject, QModelIndex, pyqtSignal, pyqtBoundSignal, Qt
 from PyQt5.QtSql import QSqlTableModel, QSqlError
@@ -9,6 +9,8 @@ from utils.const import SYMB
 from utils.gui.enums import PubType
 from utils.gui.fileDatabase import FileDatabase as TDB
 from utils.gui.fileManager import FileManager
+from utils.gui.helpers import torrent_title
+from utils.predict import Predictor
 
 
 class TableModel(QSqlTableModel):
@@ -23,6 +25,7 @@ class TableModel(QSqlTableModel):
         self.setEditStrategy(self.OnManualSubmit)
         self.root = None
         self.pendingPaths = set()
+        self.predictor = None  # type: Optional[Predictor]
 
     def updateRoot(self, root: Path) -> None:
         """Set model data according to `root`"""
@@ -58,6 +61,12 @@ class TableModel(QSqlTableModel):
         self.manager.db.updatePubtypes(self.root, names, relpaths, newPubtype)
         self.select()
 
+    def updatePubtypesByPaths(self, names: Iterable[str], relpaths: Iterable[str], newPubtype: PubType,
+                              root: Optional[Path] = None):
+        """按文件名和相对路径更新，用于行号可能已经变化的后台任务，`root` 默认为当前工作目录"""
+        self.manager.db.updatePubtypes(root or self.root, names, relpaths, newPubtype)
+        self.select()
+
     def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
         if role == Qt.DisplayRole:
             if index.column() == TDB.COL_BT:
@@ -69,8 +78,20 @@ class TableModel(QSqlTableModel):
                     return SYMB.PEND
                 exists_bt = bool(super().data(index))
                 return SYMB.YES if exists_bt else SYMB.NO
+        elif role == Qt.ToolTipRole and index.column() == TDB.COL_NAME and self.predictor is not None:
+            # 不联网，按本地发布历史显示将要使用的发布模板
+            return self.templateTip(super().data(index))
         return super().data(index, role)
 
+    def templateTip(self, name: str) -> str:
+        prediction = self.predictor.template(torrent_title(Path(name)))
+        if prediction is None:
+            return '发布历史中没有可用的模板'
+        torrent = prediction.torrent
+        category = torrent.category_tag.locale.zh_cn if torrent.category_tag else ''
+        tags = '; '.join(tag.locale.zh_cn or tag.name for tag in torrent.tags or [])
+        return f'模板：{torrent.title}（相似度 {prediction.confidence:.2f}）\n分类：{category}\n标签：{tags}'
+
     def addPendings(self, vidpaths: set[Path]):
         self.pendingPaths = self.pendingPaths.union(vidpaths)
 
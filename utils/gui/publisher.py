@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from pathlib import Path
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtBoundSignal
+
+from core.client import Bangumi
+from models.bangumi import MyTeam, UploadResponse
+from utils.aio import submit
+from utils.const import PUBLISH
+from utils.dedupe import InfoHashIndex
+from utils.jobqueue import JobQueue, drain
+from utils.predict import Predictor
+from utils.publish import BatchReport, PublishJob, Stage
+
+
+class UploadThread(QThread):
+    """在后台上传单个种子，预览窗口在此期间先显示本地模板"""
+    uploaded = pyqtSignal(UploadResponse)  # type: pyqtBoundSignal
+    failed = pyqtSignal(str)  # type: pyqtBoundSignal
+
+    def __init__(self, parent: QObject, client: Bangumi, torrentpath: Path, team_id: str):
+        super().__init__(parent)
+        self.client = client
+        self.torrentpath = torrentpath
+        self.team_id = team_id
+
+    def run(self) -> None:
+        try:
+            resp = self.client.upload_torrent(self.torrentpath, self.team_id)
+            assert resp, 'resp 为空!'
+        except Exception as e:
+            self.failed.emit(type(e).__name__ + '\n' + str(e))
+        else:
+            self.uploaded.emit(resp)
+
+
+class PublishWorker(QThread):
+    """在后台持续执行持久化发布队列中的任务，通过信号报告每一项的进度以及每一轮的汇总结果
+
+    启动时先清理保留期已过的已完成任务，再继续上次中断的任务；因网络问题没有完成的任务按指数退避重试，
+    队列为空时等待 `wake`。
+    """
+    progress = pyqtSignal(PublishJob, Stage)  # type: pyqtBoundSignal
+    reported = pyqtSignal(BatchReport)  # type: pyqtBoundSignal
+
+    def __init__(self, parent: QObject, client: Bangumi, myteam: MyTeam, queue: JobQueue, concurrency: int,
+                 deadline: float, index: Optional[InfoHashIndex] = None, predictor: Optional[Predictor] = None):
+        super().__init__(parent)
+        self.client = client
+        self.myteam = myteam
+        self.queue = queue
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.index = index
+        self.predictor = predictor
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._future = None  # type: Optional[Future]
+
+    def wake(self):
+        """有新任务加入队列"""
+        self._wake.set()
+
+    def stop(self):
+        """停止执行，正在进行的任务会在下次启动时继续"""
+        self._stopped.set()
+        self._wake.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def run(self) -> None:
+        self.queue.purge_done(time.time() - PUBLISH.KEEP_DONE)
+        client = self.client.as_async()
+        delay = PUBLISH.RESUME_DELAY
+        while not self._stopped.is_set():
+            self._wake.clear()
+            self._future = submit(drain(
+                client, self.myteam, self.queue, self.concurrency,
+                on_progress=self.progress.emit, deadline=self.deadline, index=self.index,
+                predictor=self.predictor,
+            ))
+            try:
+                report = self._future.result()
+            except CancelledError:
+                break
+            if report.results:
+                self.reported.emit(report)
+            if self.queue.pending():
+                # 网络或服务器暂时不可用
+                self._wake.wait(delay)
+                delay = min(delay * 2, PUBLISH.RESUME_DELAY_MAX)
+            else:
+                delay = PUBLISH.RESUME_DELAY
+                self._wake.wait()
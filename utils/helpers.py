@@ -1,6 +1,13 @@
 import hashlib
 from typing import Optional
 
+from addict import Dict
+
+from utils.cache import ResponseCache
+from utils.const import PATHS
+from utils.ratelimit import RateLimiter
+from utils.retry import CircuitBreaker, RetryPolicy
+
 
 def str2md5(target: str) -> str:
     """将目标字符串用 md5 加密"""
@@ -16,3 +23,37 @@ def make_proxies(addr: str, port: str, enabled: bool=True) -> Optional[dict]:
     else:
         proxies = None
     return proxies
+
+
+_caches = {}  # type: dict[bool, ResponseCache]
+"""按是否使用磁盘缓存共享的响应缓存，重新登录和测试连接时复用，不会重复打开数据库"""
+
+
+def shared_cache(disk: bool) -> ResponseCache:
+    """`disk` 时使用 `PATHS.HTTP_CACHE` 的共享响应缓存，否则为只在内存中的共享缓存"""
+    if (cache := _caches.get(disk)) is None:
+        cache = _caches[disk] = ResponseCache(PATHS.HTTP_CACHE if disk else None)
+    return cache
+
+
+def make_client_options(net: Dict) -> dict:
+    """将配置文件中的 net 设置转换为 `utils.net.make_client` 的参数"""
+    return dict(
+        max_connections=int(net.maxConnections),
+        max_keepalive_connections=int(net.maxKeepalive),
+        keepalive_expiry=float(net.keepaliveExpiry),
+        http2=bool(net.http2),
+        retry=RetryPolicy(
+            retries=int(net.retries),
+            backoff=float(net.backoff),
+            backoff_max=float(net.backoffMax),
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=int(net.breakerThreshold),
+            reset_timeout=float(net.breakerReset),
+        ),
+        cache=shared_cache(bool(net.diskCache)),
+        limiter=RateLimiter({
+            path: (float(limit.rate), int(limit.burst)) for path, limit in net.rateLimits.items()
+        }),
+    )
@@ -0,0 +1,177 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+import utils.jsonlib as json
+from core.client import AsyncBangumi
+from models.bangumi import Torrent
+from models.lazy import LazyTorrent
+from utils.const import HISTORY, PATHS
+
+__all__ = ["HistoryStore", "sync_history"]
+
+
+class HistoryStore(object):
+    """已发布种子的本地 sqlite 镜像"""
+
+    def __init__(self, path: Path = PATHS.HISTORY):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS torrents ('
+                'id TEXT PRIMARY KEY,'
+                'title TEXT NOT NULL,'
+                'publish_time REAL NOT NULL,'
+                'info_hash TEXT,'
+                'category_tag_id TEXT,'
+                'team_id TEXT,'
+                'raw BLOB NOT NULL'
+                ');'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_torrents_time ON torrents(publish_time);')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_torrents_hash ON torrents(info_hash);')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);')
+            self._hashes = {
+                h.lower() for (h,) in self._conn.execute('SELECT info_hash FROM torrents WHERE info_hash IS NOT NULL;')
+            }  # type: set[str]
+
+    def __contains__(self, torrent_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM torrents WHERE id = ?;', (torrent_id,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM torrents;').fetchone()[0]
+
+    def add(self, torrents: Iterable[Union[Torrent, LazyTorrent]]) -> int:
+        """添加（或更新）种子，返回写入的条数"""
+        rows = [
+            (
+                t.id,
+                t.title,
+                t.publish_time.timestamp(),
+                t.info_hash,
+                t.category_tag_id,
+                t.team_id,
+                json.dumpb(t.dict(by_alias=True)),
+            )
+            for t in torrents
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO torrents'
+                '(id, title, publish_time, info_hash, category_tag_id, team_id, raw)'
+                ' VALUES(?, ?, ?, ?, ?, ?, ?);',
+                rows,
+            )
+            self._hashes.update(row[3].lower() for row in rows if row[3])
+        return len(rows)
+
+    def has_info_hash(self, info_hash: str) -> bool:
+        """是否发布过 info-hash 相同的种子"""
+        return info_hash.lower() in self._hashes
+
+    def get(self, torrent_id: str) -> Optional[Torrent]:
+        with self._lock:
+            row = self._conn.execute('SELECT raw FROM torrents WHERE id = ?;', (torrent_id,)).fetchone()
+        return Torrent.parse_obj(json.loads(row[0])) if row else None
+
+    def torrents(self, limit: Optional[int] = None) -> Iterator[Torrent]:
+        """按发布时间从新到旧返回"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT raw FROM torrents ORDER BY publish_time DESC LIMIT ?;', (limit or -1,)
+            ).fetchall()
+        for (raw,) in rows:
+            yield Torrent.parse_obj(json.loads(raw))
+
+    def export_ndjson(self, path: Path) -> int:
+        """把全部种子按发布时间从旧到新导出为 NDJSON，返回条数"""
+        with self._lock, path.open('wb') as f:
+            rows = self._conn.execute('SELECT raw FROM torrents ORDER BY publish_time;')
+            return json.dump_lines((raw.encode('utf-8') if isinstance(raw, str) else raw for (raw,) in rows), f)
+
+    def import_ndjson(self, path: Path, batch: int = HISTORY.IMPORT_BATCH) -> int:
+        """逐行读取 `export_ndjson` 导出的文件并写入，返回写入的条数"""
+        added = 0
+        with path.open('rb') as f:
+            torrents = []
+            for raw in json.iterload(f):
+                torrents.append(LazyTorrent(raw))
+                if len(torrents) >= batch:
+                    added += self.add(torrents)
+                    torrents.clear()
+            added += self.add(torrents)
+        return added
+
+    def titles(self, after: int = 0) -> list[tuple[int, str, str, float]]:
+        """rowid 大于 `after` 的 (rowid, id, title, publish_time)，用于增量建立索引"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT rowid, id, title, publish_time FROM torrents WHERE rowid > ? ORDER BY rowid;', (after,)
+            ).fetchall()
+
+    def backfill_from(self) -> Optional[int]:
+        """完整同步（回填）应当继续的页码，已经完成时为 None
+
+        从没有记录过时为 1：旧版本只做增量同步，镜像中可能有缺口，需要完整地同步一次。
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'backfill_page';").fetchone()
+        if row is None:
+            return 1
+        return int(row[0]) or None
+
+    def set_backfill(self, page: Optional[int]):
+        """记录已经完整写入的最后一页，None 表示回填完成"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES('backfill_page', ?);", (str(page or 0),)
+            )
+
+    def latest_time(self) -> Optional[float]:
+        with self._lock:
+            return self._conn.execute('SELECT MAX(publish_time) FROM torrents;').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+async def sync_history(client: AsyncBangumi, store: HistoryStore,
+                       concurrency: int = HISTORY.CONCURRENCY) -> int:
+    """把账户的发布历史增量同步到 `store`，返回新增的条数
+
+    从最新的一页开始并发获取，遇到已经同步过的种子后不再请求更早的页。
+    第一次完整同步（回填）被中断时，已经写入的页码记录在 `store` 中，之后每次同步都从该页继续向后获取，
+    直到最后一页；新发布的种子只会把旧种子推到更后面的页，从记录的页码重新开始不会漏掉种子。
+    """
+    added = 0
+    backfill = store.backfill_from()
+    page_no = 0
+    async for page in client.iter_my(concurrency, lazy=True):
+        page_no += 1
+        new = [t for t in page.torrents if t.id not in store]
+        added += store.add(new)
+        if len(new) < len(page.torrents):
+            break
+        if backfill is not None and page_no > backfill:
+            backfill = page_no
+            store.set_backfill(backfill)
+    else:
+        # 没有遇到同步过的种子，全部历史都已经写入
+        store.set_backfill(None)
+        return added
+    if backfill is None:
+        return added
+
+    page_no = backfill - 1
+    async for page in client.iter_my(concurrency, lazy=True, start=backfill):
+        page_no += 1
+        added += store.add([t for t in page.torrents if t.id not in store])
+        store.set_backfill(page_no)
+    store.set_backfill(None)
+    return added
@@ -0,0 +1,110 @@
+"""
+发布简介的处理
+
+编辑时使用格式化（prettify）后的 html，发布时发送压缩后的 html。两者都按 (种子 id, 内容的哈希) 缓存，
+同一个系列每集都使用同一份简介，只需处理一次；不需要显示的自动发布完全不解析 html。
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup
+
+from utils.const import INTRO
+
+__all__ = ["IntroCache", "INTROS", "prettify", "minify"]
+
+# 保持原样的片段：注释、<pre> 等，以及普通标签
+_token = re.compile(
+    r"(<!--.*?-->|<(pre|textarea|script|style)\b.*?</\2\s*>|<[^>]*>)",
+    re.S | re.I,
+)
+_space = re.compile(r"\s+")
+_block = re.compile(
+    r"</?(?:address|article|aside|blockquote|br|center|dd|div|dl|dt|fieldset|figcaption|figure|footer|form"
+    r"|h[1-6]|header|hr|li|main|nav|ol|p|section|table|tbody|td|tfoot|th|thead|tr|ul)\b",
+    re.I,
+)
+
+
+def prettify(html: str) -> str:
+    """格式化，便于编辑
+
+    使用 html.parser：lxml 会把片段包进 `<html><body>`，并把 `<style>` 等移到 `<head>`，结果与原文的结构不同。
+    """
+    return BeautifulSoup(html, "html.parser").prettify()
+
+
+def minify(html: str) -> str:
+    """压缩 html：去掉注释，连续的空白合并为一个空格，块级标签两侧的空白去掉
+
+    `<pre>`、`<textarea>`、`<script>`、`<style>` 的内容保持原样，行内标签之间的空格保留，显示效果不变。
+    """
+    tokens = []  # type: list[tuple[bool, str]]  # (是否为标签, 内容)
+    text, pos = "", 0
+    for m in _token.finditer(html):
+        text += html[pos:m.start()]
+        pos = m.end()
+        if m[0].startswith("<!--"):
+            continue
+        tokens.append((False, _space.sub(" ", text)))
+        tokens.append((True, m[0]))
+        text = ""
+    tokens.append((False, _space.sub(" ", text + html[pos:])))
+
+    parts = []  # type: list[str]
+    for i, (is_tag, part) in enumerate(tokens):
+        if not is_tag:
+            # 块级标签两侧的空白不影响显示
+            if i > 0 and _block.match(tokens[i - 1][1]):
+                part = part.lstrip()
+            if i + 1 < len(tokens) and _block.match(tokens[i + 1][1]):
+                part = part.rstrip()
+        parts.append(part)
+    return "".join(parts).strip()
+
+
+class IntroCache(object):
+    """按 (种子 id, 内容的哈希, 处理方式) 缓存处理后的简介，最多保留 `maxsize` 条"""
+
+    def __init__(self, maxsize: int = INTRO.CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # type: OrderedDict[tuple[str, str, str], str]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, kind: str, func: Callable[[str], str], html: str, torrent_id: Optional[str]) -> str:
+        key = (torrent_id or "", hashlib.blake2b(html.encode("utf-8"), digest_size=16).hexdigest(), kind)
+        with self._lock:
+            if (value := self._data.get(key)) is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = func(html)
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def prettify(self, html: str, torrent_id: Optional[str] = None) -> str:
+        return self._get("pretty", prettify, html, torrent_id)
+
+    def minify(self, html: str, torrent_id: Optional[str] = None) -> str:
+        return self._get("minified", minify, html, torrent_id)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+INTROS = IntroCache()
+"""全局的简介缓存"""
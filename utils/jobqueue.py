@@ -0,0 +1,334 @@
+import asyncio
+import enum
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from httpx import HTTPStatusError, TransportError
+
+import utils.jsonlib as json
+from core.client import AsyncBangumi
+from errors import CircuitOpenError, PublishTimeout, UploadTimeout
+from models.bangumi import MyTeam, Torrent, UploadResponse
+from models.lazy import LazyTorrent, LazyUploadResponse
+from utils.bangumi import PublishInfo
+from utils.bencode import BencodeError, torrent_info_hash
+from utils.const import PATHS, PUBLISH
+from utils.dedupe import InfoHashIndex
+from utils.predict import Predictor
+from utils.publish import BatchReport, ProgressCallback, PublishJob, PublishResult, Stage
+
+__all__ = ["JobState", "QueuedJob", "JobQueue", "is_transient", "run_job", "drain"]
+
+
+class JobState(enum.Enum):
+    """持久化任务的状态"""
+    Queued = 'queued'
+    Uploading = 'uploading'
+    Uploaded = 'uploaded'  # 已经拿到 file_id
+    Publishing = 'publishing'
+    Done = 'done'
+    Failed = 'failed'
+
+
+PENDING = (JobState.Queued, JobState.Uploading, JobState.Uploaded, JobState.Publishing)
+"""尚未结束的状态"""
+
+
+class QueuedJob:
+    """队列中的一条任务"""
+    def __init__(self, id_: int, job: PublishJob, state: JobState, file_id: Optional[str] = None,
+                 response: Optional[bytes] = None, torrent_id: Optional[str] = None,
+                 error: Optional[str] = None, attempts: int = 0, info_hash: Optional[str] = None,
+                 publishing_at: Optional[float] = None):
+        self.id = id_
+        self.job = job
+        self.state = state
+        self.file_id = file_id
+        self.response = response  # 上传接口的响应，恢复时用来匹配历史发布
+        self.torrent_id = torrent_id
+        self.error = error
+        self.attempts = attempts
+        self.info_hash = info_hash
+        self.publishing_at = publishing_at  # 第一次开始发布的时间，恢复时查找发布历史到这个时间为止
+
+
+class JobQueue(object):
+    """保存在 sqlite 中的发布队列，程序退出或崩溃后可以从中断处继续"""
+
+    def __init__(self, path: Path = PATHS.JOBS):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                'key TEXT NOT NULL,'
+                'torrentpath TEXT NOT NULL,'
+                'title TEXT NOT NULL,'
+                'priority INT NOT NULL,'
+                'state TEXT NOT NULL,'
+                'file_id TEXT,'
+                'response BLOB,'
+                'torrent_id TEXT,'
+                'error TEXT,'
+                'attempts INT NOT NULL DEFAULT 0,'
+                'updated REAL NOT NULL,'
+                'info_hash TEXT,'
+                'publishing_at REAL'
+                ');'
+            )
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs);')}
+            if 'info_hash' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN info_hash TEXT;')
+            if 'publishing_at' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN publishing_at REAL;')
+                # 旧版本中断在发布阶段的任务，用最后更新的时间代替
+                self._conn.execute('UPDATE jobs SET publishing_at = updated WHERE state = ?;',
+                                   (JobState.Publishing.value,))
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_hash ON jobs(info_hash);')
+            self._published = {
+                h for (h,) in self._conn.execute(
+                    'SELECT info_hash FROM jobs WHERE state = ? AND info_hash IS NOT NULL;', (JobState.Done.value,)
+                )
+            }  # type: set[str]
+
+    _columns = ('id, key, torrentpath, title, priority, state, file_id, response, torrent_id, error, attempts,'
+                ' info_hash, publishing_at')
+
+    @staticmethod
+    def _from_row(row: tuple) -> QueuedJob:
+        (id_, key, torrentpath, title, priority, state, file_id, response, torrent_id, error, attempts,
+         info_hash, publishing_at) = row
+        key = json.loads(key)
+        job = PublishJob(tuple(key) if isinstance(key, list) else key, Path(torrentpath), title, priority)
+        return QueuedJob(id_, job, JobState(state), file_id, response, torrent_id, error, attempts, info_hash,
+                         publishing_at)
+
+    def put(self, jobs: Iterable[PublishJob]) -> int:
+        """加入队列，已经在队列中且尚未结束的种子会被跳过，返回加入的条数"""
+        pending = {str(item.job.torrentpath) for item in self.pending()}
+        rows = []
+        for job in jobs:
+            if str(job.torrentpath) in pending:
+                continue
+            pending.add(str(job.torrentpath))
+            try:
+                info_hash = torrent_info_hash(job.torrentpath)
+            except (OSError, BencodeError):
+                info_hash = None  # 种子可能还没有制作完成，上传前会再计算
+            rows.append((json.dumps(job.key), str(job.torrentpath), job.title, job.priority,
+                         JobState.Queued.value, time.time(), info_hash))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO jobs(key, torrentpath, title, priority, state, updated, info_hash)'
+                ' VALUES(?, ?, ?, ?, ?, ?, ?);',
+                rows,
+            )
+        return len(rows)
+
+    def get(self, id_: int) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._conn.execute(f'SELECT {self._columns} FROM jobs WHERE id = ?;', (id_,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def pending(self) -> list[QueuedJob]:
+        """尚未结束的任务，按优先级排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {self._columns} FROM jobs WHERE state IN ({", ".join("?" * len(PENDING))})'
+                ' ORDER BY priority, id;',
+                [state.value for state in PENDING],
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def has_info_hash(self, info_hash: str) -> bool:
+        """是否已经通过队列发布过 info-hash 相同的种子"""
+        return info_hash.lower() in self._published
+
+    def counts(self) -> dict[JobState, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state;').fetchall()
+        return {JobState(state): n for state, n in rows}
+
+    def _update(self, id_: int, state: JobState, **fields):
+        fields |= dict(state=state.value, updated=time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE jobs SET {", ".join(f"{name} = ?" for name in fields)} WHERE id = ?;',
+                [*fields.values(), id_],
+            )
+
+    def mark_uploading(self, item: QueuedJob, info_hash: Optional[str] = None):
+        item.info_hash = info_hash or item.info_hash
+        self._update(item.id, JobState.Uploading, info_hash=item.info_hash)
+        item.state = JobState.Uploading
+
+    def mark_uploaded(self, item: QueuedJob, resp: Union[UploadResponse, LazyUploadResponse]):
+        item.file_id = resp.file_id
+        item.response = json.dumpb(resp.dict(by_alias=True))
+        self._update(item.id, JobState.Uploaded, file_id=item.file_id, response=item.response)
+        item.state = JobState.Uploaded
+
+    def mark_publishing(self, item: QueuedJob):
+        item.publishing_at = item.publishing_at or time.time()
+        self._update(item.id, JobState.Publishing, publishing_at=item.publishing_at)
+        item.state = JobState.Publishing
+
+    def mark_done(self, item: QueuedJob, torrent: Union[Torrent, LazyTorrent]):
+        item.torrent_id = torrent.id
+        self._update(item.id, JobState.Done, torrent_id=torrent.id, error=None)
+        item.state = JobState.Done
+        if item.info_hash:
+            self._published.add(item.info_hash)
+
+    def mark_failed(self, item: QueuedJob, error: BaseException):
+        item.error = f'{type(error).__name__}: {error}'
+        self._update(item.id, JobState.Failed, error=item.error)
+        item.state = JobState.Failed
+
+    def record_error(self, item: QueuedJob, error: BaseException):
+        """暂时性的错误：保持当前状态，稍后重试"""
+        item.error = f'{type(error).__name__}: {error}'
+        item.attempts += 1
+        self._update(item.id, item.state, error=item.error, attempts=item.attempts)
+
+    def retry_failed(self) -> int:
+        """把失败的任务重新放回队列，已上传的不会再次上传"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'UPDATE jobs SET state = CASE WHEN file_id IS NULL THEN ? ELSE ? END, error = NULL, updated = ?'
+                ' WHERE state = ?;',
+                (JobState.Queued.value, JobState.Uploaded.value, time.time(), JobState.Failed.value),
+            )
+        return cursor.rowcount
+
+    def purge_done(self, before: float) -> int:
+        """删除在 `before` 之前完成的任务，返回删除的条数
+
+        只删除足够早的：发布历史同步之前，完成的任务还用于检查重复的种子。
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM jobs WHERE state = ? AND updated < ?;', (JobState.Done.value, before)
+            )
+            self._published = {
+                h for (h,) in self._conn.execute(
+                    'SELECT info_hash FROM jobs WHERE state = ? AND info_hash IS NOT NULL;', (JobState.Done.value,)
+                )
+            }
+        return cursor.rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+def is_transient(error: BaseException) -> bool:
+    """网络中断、服务器出错等稍后重试可能成功的错误"""
+    if isinstance(error, HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (TransportError, CircuitOpenError, UploadTimeout, PublishTimeout, asyncio.TimeoutError))
+
+
+async def find_published(client: AsyncBangumi, file_id: str, since: Optional[float] = None) -> Optional[LazyTorrent]:
+    """在发布历史中查找使用 `file_id` 发布的种子
+
+    从最新的一页开始逐页查找，直到某一页最早的种子早于 `since`（开始发布的时间，留出 `PUBLISH.CLOCK_SKEW` 的误差）；
+    没有给出 `since` 时只查找第一页。
+    """
+    async for page in client.iter_my(1, lazy=True):
+        for torrent in page.torrents:
+            if torrent.file_id == file_id:
+                return torrent
+        if since is None or not page.torrents or \
+                page.torrents[-1].publish_time.timestamp() < since - PUBLISH.CLOCK_SKEW:
+            break
+    return None
+
+
+async def run_job(client: AsyncBangumi, myteam: MyTeam, queue: JobQueue, item: QueuedJob,
+                  on_progress: Optional[ProgressCallback] = None,
+                  deadline: float = PUBLISH.UPLOAD_DEADLINE,
+                  index: Optional[InfoHashIndex] = None,
+                  predictor: Optional[Predictor] = None) -> Optional[PublishResult]:
+    """从任务当前的状态继续执行，每一步都先写入队列
+
+    - 上传前先在 `index` 中检查 info-hash，重复的种子直接失败；
+    - 已经拿到 file_id 的任务不会再次上传；
+    - 给出 `predictor` 时同时在本地发布历史中查找最相似的种子；
+    - 中断在发布阶段的任务先在发布历史中查找，避免重复发布；
+    - 暂时性的错误返回 None，任务保持原状态等待下次重试。
+    """
+    job = item.job
+
+    def report(stage: Stage):
+        if on_progress:
+            on_progress(job, stage)
+
+    stage = Stage.Uploading
+    try:
+        if item.state == JobState.Publishing:
+            if torrent := await find_published(client, item.file_id, item.publishing_at):
+                queue.mark_done(item, torrent)
+                report(Stage.Done)
+                return PublishResult(job, Stage.Done, torrent=torrent.materialize())
+
+        if item.state in (JobState.Queued, JobState.Uploading):
+            report(stage)
+            if index is not None:
+                queue.mark_uploading(item, index.check(job.torrentpath))
+            else:
+                queue.mark_uploading(item)
+            resp = await client.upload_torrent(job.torrentpath, myteam.id, deadline=deadline, lazy=True)
+            assert resp, 'resp 为空!'
+            queue.mark_uploaded(item, resp)
+        else:
+            resp = LazyUploadResponse(json.loads(item.response))
+
+        stage = Stage.Predicting
+        report(stage)
+        pubInfo = PublishInfo(myteam, resp, job.title, predictor=predictor)
+        await asyncio.to_thread(pubInfo.loadInfoFromBestPrediction, resp, False)
+
+        stage = Stage.Publishing
+        report(stage)
+        queue.mark_publishing(item)
+        torrent = await client.publish(**pubInfo.to_publish_info())
+    except Exception as e:
+        if is_transient(e):
+            queue.record_error(item, e)
+            report(Stage.Queued)
+            return None
+        queue.mark_failed(item, e)
+        report(Stage.Failed)
+        return PublishResult(job, stage, error=e)
+    queue.mark_done(item, torrent)
+    report(Stage.Done)
+    return PublishResult(job, Stage.Done, torrent=torrent)
+
+
+async def drain(client: AsyncBangumi, myteam: MyTeam, queue: JobQueue,
+                concurrency: int = PUBLISH.CONCURRENCY,
+                on_progress: Optional[ProgressCallback] = None,
+                deadline: float = PUBLISH.UPLOAD_DEADLINE,
+                index: Optional[InfoHashIndex] = None,
+                predictor: Optional[Predictor] = None) -> BatchReport:
+    """按优先级并发执行队列中尚未结束的任务，返回本轮结束（成功或失败）的任务
+
+    因暂时性错误没有完成的任务留在队列中，可以通过 `JobQueue.pending` 得知。
+    """
+    items = queue.pending()
+    results = []  # type: list[PublishResult]
+
+    async def worker():
+        while items:
+            if result := await run_job(client, myteam, queue, items.pop(0), on_progress, deadline, index,
+                                       predictor):
+                results.append(result)
+
+    await asyncio.gather(*(worker() for _ in range(min(max(concurrency, 1), len(items)))))
+    return BatchReport(results)
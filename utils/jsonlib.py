@@ -1,41 +1,119 @@
-from datetime import datetime
+"""
+统一的 json 后端，全部基于 orjson
+
+文件以 bytes 读写，`write_file` 先写入临时文件再替换；较大的历史数据使用 NDJSON（每行一个值），
+通过 `iterload` 逐行解码。datetime 统一按 RFC 3339 编码，与 pydantic 的解析一致。
+"""
+import io
+import os
 from json import JSONEncoder as _JSONEncoder
-from typing import Any
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, Union
 
-import ujson
 from orjson import (
     JSONDecodeError as _JSONDecodeError,
     JSONEncodeError as _JSONEncodeError,
+    OPT_INDENT_2,
+    OPT_SORT_KEYS,
     dumps as json_dumps,
     loads as json_loads,
 )
 
+__all__ = [
+    "JSONEncodeError", "JSONDecodeError", "JSONEncoder",
+    "loads", "dumps", "dumpb", "load", "dump",
+    "read_file", "write_file", "write_bytes", "iterload", "dump_lines",
+]
+
 JSONEncodeError = _JSONEncodeError
 JSONDecodeError = _JSONDecodeError
 
+StrOrPath = Union[str, Path]
+
+
+def _option(indent: Optional[int], sort_keys: bool, option: int) -> int:
+    if indent:
+        option |= OPT_INDENT_2
+    if sort_keys:
+        option |= OPT_SORT_KEYS
+    return option
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    return json_loads(data)
+
+
+def dumpb(obj: Any, *, default: Optional[Callable[[Any], Any]] = None, indent: Optional[int] = None,
+          sort_keys: bool = False, option: int = 0, **_) -> bytes:
+    """编码为 utf-8 bytes
+
+    `indent` 只区分有无（orjson 固定缩进两格），`ensure_ascii` 等 `json` 模块的其它参数会被忽略，
+    以便兼容 pydantic 的 `json_dumps` 调用方式。
+    """
+    return json_dumps(obj, default=default, option=_option(indent, sort_keys, option))
+
+
+def dumps(obj: Any, **kwargs) -> str:
+    return dumpb(obj, **kwargs).decode("utf-8")
+
+
+def load(fp: IO) -> Any:
+    """从文件对象读取，文本和二进制模式都可以"""
+    return json_loads(fp.read())
+
+
+def dump(obj: Any, fp: IO, **kwargs) -> None:
+    data = dumpb(obj, **kwargs)
+    fp.write(data.decode("utf-8") if isinstance(fp, io.TextIOBase) else data)
+
+
+def read_file(path: StrOrPath) -> Any:
+    return json_loads(Path(path).read_bytes())
 
-def _default(value: Any):
-    if isinstance(value, datetime):
-        return value.timestamp()
-    return value
 
+def write_file(obj: Any, path: StrOrPath, mode: int = 0o666, **kwargs) -> None:
+    """原子地写入文件，见 `write_bytes`"""
+    write_bytes(dumpb(obj, **kwargs), path, mode)
 
-def loads(*args, **kwargs) -> Any:
-    return json_loads(*args, **kwargs)
 
+def write_bytes(data: bytes, path: StrOrPath, mode: int = 0o666) -> None:
+    """原子地写入文件：先写入同目录下的临时文件并刷到磁盘，再替换 `path`
 
-def load(*args, **kwargs) -> Any:
-    return ujson.load(*args, **kwargs)
+    `mode` 为新文件的权限（受 umask 影响）。
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
-def dumps(*args, **kwargs) -> str:
-    return json_dumps(*args, default=_default, **kwargs).decode(
-        encoding="utf-8"
-    )
+def iterload(fp: IO[bytes]) -> Iterator[Any]:
+    """逐行解码 NDJSON，内存占用只与单行的大小有关，空行会被跳过"""
+    for lineno, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json_loads(line)
+        except JSONDecodeError as e:
+            raise JSONDecodeError(f"line {lineno}: {e.msg}", e.doc, e.pos) from None
 
 
-def dump(*args, **kwargs) -> None:
-    return ujson.dump(*args, **kwargs)
+def dump_lines(objs: Iterable[Any], fp: IO[bytes], **kwargs) -> int:
+    """以 NDJSON 格式写入，已经编码好的 bytes 原样写入，返回写入的行数"""
+    count = 0
+    for obj in objs:
+        fp.write(obj if isinstance(obj, (bytes, bytearray)) else dumpb(obj, **kwargs))
+        fp.write(b"\n")
+        count += 1
+    return count
 
 
 class JSONEncoder(_JSONEncoder):
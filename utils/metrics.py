@@ -0,0 +1,216 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Optional
+
+import utils.jsonlib as json
+
+__all__ = ["Histogram", "EndpointMetrics", "Metrics", "RequestTrace", "METRICS", "PHASES"]
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+"""直方图的上界（秒）"""
+
+PHASES = {
+    "connection.connect_tcp": "connect",  # 包括 DNS 解析和 TCP 连接
+    "connection.start_tls": "tls",
+    "http11.send_request_headers": "send",
+    "http11.send_request_body": "send",
+    "http2.send_request_headers": "send",
+    "http2.send_request_body": "send",
+    "http11.receive_response_headers": "wait",  # 等待服务器处理
+    "http2.receive_response_headers": "wait",
+    "http11.receive_response_body": "receive",
+    "http2.receive_response_body": "receive",
+}
+"""httpcore trace 事件与请求阶段的对应关系"""
+
+
+class Histogram(object):
+    __slots__ = "counts", "sum", "count"
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """按桶估计分位数，返回所在桶的上界"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        acc = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            acc += n
+            if acc >= target:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return dict(
+            count=self.count,
+            sum=round(self.sum, 6),
+            avg=round(self.sum / self.count, 6) if self.count else 0.0,
+            p50=self.quantile(0.5),
+            p95=self.quantile(0.95),
+            buckets=dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts)),
+        )
+
+
+class EndpointMetrics(object):
+    """单个接口的统计"""
+
+    def __init__(self):
+        self.total = Histogram()
+        self.phases = {}  # type: dict[str, Histogram]
+        self.statuses = Counter()  # type: Counter[str]
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return dict(
+            total=self.total.to_dict(),
+            phases={name: h.to_dict() for name, h in self.phases.items()},
+            statuses=dict(self.statuses),
+            bytes_sent=self.bytes_sent,
+            bytes_received=self.bytes_received,
+            retries=self.retries,
+            throttled=self.throttled,
+            throttle_seconds=round(self.throttle_seconds, 6),
+        )
+
+
+class RequestTrace(object):
+    """httpcore 的 trace 回调，记录单个请求各阶段的耗时"""
+
+    __slots__ = "started", "phases", "on_event"
+
+    def __init__(self, on_event=None):
+        self.started = {}  # type: dict[str, float]
+        self.phases = {}  # type: dict[str, float]
+        self.on_event = on_event
+
+    async def __call__(self, event: str, info: dict):
+        name, _, state = event.rpartition(".")
+        if state == "started":
+            self.started[name] = time.perf_counter()
+        elif state in ("complete", "failed") and name in self.started:
+            if phase := PHASES.get(name):
+                elapsed = time.perf_counter() - self.started.pop(name)
+                self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+class Metrics(object):
+    """按 (方法, 路径) 统计请求耗时、各阶段耗时、字节数、状态码和重试次数"""
+
+    def __init__(self):
+        self.endpoints = {}  # type: dict[tuple[str, str], EndpointMetrics]
+        self._lock = threading.Lock()
+
+    def _get(self, method: str, path: str) -> EndpointMetrics:
+        key = (method.upper(), path)
+        if (endpoint := self.endpoints.get(key)) is None:
+            endpoint = self.endpoints[key] = EndpointMetrics()
+        return endpoint
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        elapsed: float,
+        status: str,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        trace: Optional[RequestTrace] = None,
+    ):
+        with self._lock:
+            endpoint = self._get(method, path)
+            endpoint.total.observe(elapsed)
+            endpoint.statuses[status] += 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.bytes_received += bytes_received
+            if trace is not None:
+                for phase, value in trace.phases.items():
+                    endpoint.phases.setdefault(phase, Histogram()).observe(value)
+
+    def record_retry(self, method: str, path: str):
+        with self._lock:
+            self._get(method, path).retries += 1
+
+    def record_throttle(self, method: str, path: str, waited: float):
+        """请求因限流等待了 `waited` 秒"""
+        with self._lock:
+            endpoint = self._get(method, path)
+            endpoint.throttled += 1
+            endpoint.throttle_seconds += waited
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {f"{method} {path}": e.to_dict() for (method, path), e in sorted(self.endpoints.items())}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self, prefix: str = "torrentuploader_http") -> str:
+        """Prometheus 文本格式"""
+        families = {
+            "request_duration_seconds": ("histogram", []),
+            "phase_duration_seconds": ("histogram", []),
+            "responses_total": ("counter", []),
+            "bytes_sent_total": ("counter", []),
+            "bytes_received_total": ("counter", []),
+            "retries_total": ("counter", []),
+            "throttled_total": ("counter", []),
+            "throttle_seconds_total": ("counter", []),
+        }
+
+        def histogram(family: str, labels: str, h: Histogram):
+            samples = families[family][1]
+            name = f"{prefix}_{family}"
+            acc = 0
+            for bound, n in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                acc += n
+                samples.append(f'{name}_bucket{{{labels},le="{bound}"}} {acc}')
+            samples.append(f"{name}_sum{{{labels}}} {h.sum}")
+            samples.append(f"{name}_count{{{labels}}} {h.count}")
+
+        def counter(family: str, labels: str, value: float):
+            families[family][1].append(f"{prefix}_{family}{{{labels}}} {value}")
+
+        with self._lock:
+            for (method, path), e in sorted(self.endpoints.items()):
+                labels = f'method="{method}",path="{path}"'
+                histogram("request_duration_seconds", labels, e.total)
+                for phase, h in sorted(e.phases.items()):
+                    histogram("phase_duration_seconds", f'{labels},phase="{phase}"', h)
+                for status, n in sorted(e.statuses.items()):
+                    counter("responses_total", f'{labels},status="{status}"', n)
+                counter("bytes_sent_total", labels, e.bytes_sent)
+                counter("bytes_received_total", labels, e.bytes_received)
+                counter("retries_total", labels, e.retries)
+                counter("throttled_total", labels, e.throttled)
+                counter("throttle_seconds_total", labels, e.throttle_seconds)
+
+        lines = []
+        for family, (type_, samples) in families.items():
+            lines.append(f"# TYPE {prefix}_{family} {type_}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+"""进程内所有会话共用的统计"""
@@ -1,13 +1,25 @@
-from typing import Any, Optional, TYPE_CHECKING, Union
+import asyncio
+import os
+import threading
+import time
+from importlib.util import find_spec
+from typing import Any, BinaryIO, Callable, Optional, TYPE_CHECKING, Union
 
-from httpcore import URL
-from httpx import Client, Cookies, Response
+from httpx import AsyncClient, Cookies, Limits, Request, Response, TransportError, URL
 
 # noinspection PyProtectedMember
 from httpx._client import USE_CLIENT_DEFAULT, UseClientDefault
 from pydantic import PrivateAttr
 
+from errors import UploadCancelled
 from models import BaseModel
+from utils.aio import run_sync
+from utils import jsonlib
+from utils.cache import ResponseCache
+from utils.const import NET
+from utils.metrics import METRICS, Metrics, RequestTrace
+from utils.ratelimit import RateLimiter
+from utils.retry import CircuitBreaker, RetryPolicy
 
 if TYPE_CHECKING:
     # noinspection PyProtectedMember
@@ -24,9 +36,178 @@ if TYPE_CHECKING:
         URLTypes,
     )
 
+__all__ = ["AsyncNet", "ConnectionStats", "Net", "ProgressReader", "SessionClient", "make_client"]
 
-class Net(BaseModel):
-    _client: Optional[Client] = PrivateAttr(None)
+HAS_HTTP2 = find_spec("h2") is not None
+"""是否安装了 HTTP/2 所需的 h2"""
+
+
+def default_headers(base_url: URL) -> dict:
+    origin = f"{base_url.scheme}://{base_url.host}"
+    return {
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
+        "cache-control": "no-cache",
+        "DNT": "1",
+        "host": str(base_url.host),
+        "origin": origin,
+        "referer": origin + "/",
+    }
+
+
+class ConnectionStats(object):
+    """统计连接复用情况"""
+
+    __slots__ = "requests", "connections", "tls_handshakes"
+
+    def __init__(self):
+        self.requests = 0
+        """发出的请求数"""
+        self.connections = 0
+        """新建立的 TCP 连接数"""
+        self.tls_handshakes = 0
+        """TLS 握手次数"""
+
+    @property
+    def reused(self) -> int:
+        """复用已有连接的请求数"""
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> dict:
+        return dict(
+            requests=self.requests,
+            connections=self.connections,
+            tls_handshakes=self.tls_handshakes,
+            reused=self.reused,
+        )
+
+    def __repr__(self) -> str:
+        return f"ConnectionStats({self.to_dict()})"
+
+
+ProgressCallback = Callable[[int, int], None]
+"""(已发送的字节数, 总字节数)"""
+
+
+class ProgressReader(object):
+    """包装二进制文件，httpx 按块读取时报告进度，并在 `cancel` 被设置时中止上传"""
+
+    mode = "rb"
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        on_progress: Optional[ProgressCallback] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
+        self.file = file
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.sent = 0
+        self.total = os.fstat(file.fileno()).st_size
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        position = self.file.seek(offset, whence)
+        # httpx 每次发送前都会 seek(0)，重试时进度也随之归零
+        self.sent = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled()
+        chunk = self.file.read(size)
+        self.sent += len(chunk)
+        if self.on_progress is not None and chunk:
+            self.on_progress(self.sent, self.total)
+        return chunk
+
+
+class SessionClient(AsyncClient):
+    """带连接池统计的 AsyncClient，一个会话只使用一个"""
+
+    def __init__(
+        self,
+        *args,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        limiter: Optional[RateLimiter] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache or ResponseCache()
+        self.metrics = metrics or METRICS
+        self.limiter = limiter or RateLimiter()
+        self.stats = ConnectionStats()
+        self.event_hooks["request"].append(self._on_request)
+
+    async def _on_request(self, request: Request):
+        self.stats.requests += 1
+        request.extensions["trace"] = RequestTrace(self._on_trace_event)
+
+    def _on_trace_event(self, event: str):
+        if event == "connection.connect_tcp.complete":
+            self.stats.connections += 1
+        elif event == "connection.start_tls.complete":
+            self.stats.tls_handshakes += 1
+
+
+def make_client(
+    base_url: URL,
+    *,
+    proxies: Optional[dict] = None,
+    cookies: Optional["CookieTypes"] = None,
+    max_connections: int = NET.MAX_CONNECTIONS,
+    max_keepalive_connections: int = NET.MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = NET.KEEPALIVE_EXPIRY,
+    http2: bool = NET.HTTP2,
+    retry: Optional[RetryPolicy] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    cache: Optional[ResponseCache] = None,
+    metrics: Optional[Metrics] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> SessionClient:
+    """创建会话所用的客户端，所有入口都应通过它来获取客户端
+
+    HTTP/2 仅在安装了 h2 时生效。
+    """
+    return SessionClient(
+        base_url=base_url,
+        headers=default_headers(base_url),
+        cookies=cookies,
+        proxies=proxies,
+        http2=http2 and HAS_HTTP2,
+        limits=Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        retry=retry,
+        breaker=breaker,
+        cache=cache,
+        metrics=metrics,
+        limiter=limiter,
+    )
+
+
+class AsyncNet(BaseModel):
+    """异步网络请求
+
+    所有请求最终都经过 `request`，`get`/`post` 只是它的简写。
+    """
+    _client: Optional[SessionClient] = PrivateAttr(None)
 
     base_url: URL
     cookies: Optional[Cookies] = None
@@ -35,22 +216,125 @@ class Net(BaseModel):
         arbitrary_types_allowed = True
 
     @property
-    def client(self) -> Client:
+    def client(self) -> SessionClient:
         if self._client is None:
-            self._client = Client(
-                base_url=self.base_url,
-                headers={
-                    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:108.0) Gecko/20100101 Firefox/108.0",
-                    "cache-control": "no-cache",
-                    "DNT": "1",
-                    "host": str(self.base_url.host),
-                    "origin": str(self.base_url.origin),
-                    "referer": str(self.base_url.origin) + "/",
-                },
-                cookies=self.cookies,
-            )
+            self._client = make_client(self.base_url, cookies=self.cookies)
         return self._client
 
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """当前会话的连接复用情况"""
+        return self.client.stats
+
+    async def request(
+        self,
+        method: str,
+        url: "URLTypes",
+        *,
+        content: Optional["RequestContent"] = None,
+        data: Optional["RequestData"] = None,
+        files: Optional["RequestFiles"] = None,
+        json: Optional[Any] = None,
+        params: Optional["QueryParamTypes"] = None,
+        headers: Optional["HeaderTypes"] = None,
+        cookies: Optional["CookieTypes"] = None,
+        auth: Union["AuthTypes", "UseClientDefault"] = USE_CLIENT_DEFAULT,
+        follow_redirects: Union[bool, "UseClientDefault"] = USE_CLIENT_DEFAULT,
+        timeout: Union["TimeoutTypes", "UseClientDefault"] = USE_CLIENT_DEFAULT,
+        extensions: Optional["RequestExtensions"] = None,
+    ) -> Response:
+        """发送请求，按会话的 `RetryPolicy` 重试，并经过熔断器和限流，每次尝试都记录到会话的 `Metrics`"""
+        client = self.client
+        path = URL(url).path
+        attempt = 0
+        while True:
+            if waited := await client.limiter.acquire(path):
+                client.metrics.record_throttle(method, path, waited)
+            client.breaker.before_request()
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    method,
+                    url,
+                    content=content,
+                    data=data,
+                    files=files,
+                    json=json,
+                    params=params,
+                    headers=headers,
+                    cookies=cookies,
+                    auth=auth,
+                    follow_redirects=follow_redirects,
+                    timeout=timeout,
+                    extensions=extensions,
+                )
+            except TransportError as e:
+                client.metrics.record(method, path, time.perf_counter() - start, type(e).__name__)
+                client.breaker.record_failure()
+                if not client.retry.should_retry(method, path, attempt, error=e):
+                    raise
+                await asyncio.sleep(client.retry.delay(attempt))
+            else:
+                client.metrics.record(
+                    method,
+                    path,
+                    time.perf_counter() - start,
+                    str(response.status_code),
+                    int(response.request.headers.get("content-length", 0)),
+                    len(response.content),
+                    response.request.extensions.get("trace"),
+                )
+                if response.status_code >= 500:
+                    client.breaker.record_failure()
+                else:
+                    client.breaker.record_success()
+                if not client.retry.should_retry(method, path, attempt, response=response):
+                    return response
+                await asyncio.sleep(client.retry.delay(attempt, response))
+            client.metrics.record_retry(method, path)
+            attempt += 1
+
+    async def request_json(
+        self,
+        method: str,
+        url: "URLTypes",
+        *,
+        json: Optional[Any] = None,
+        params: Optional["QueryParamTypes"] = None,
+        ttl: Optional[float] = None,
+        cache_key: Optional[str] = None,
+    ) -> Any:
+        """请求并解析 json，`ttl` 不为空时响应会在会话缓存中保存 `ttl` 秒
+
+        `cache_key` 默认由方法、路径、参数和请求体组成，与用户相关的接口应当自行加上用户 id。
+        """
+        cache = self.client.cache if ttl else None
+        if cache is not None:
+            if cache_key is None:
+                cache_key = f"{method} {URL(url, params=params)} {jsonlib.dumps(json) if json else ''}"
+            if (content := cache.get(cache_key)) is not None:
+                return jsonlib.loads(content)
+        response = await self.request(method, url, json=json, params=params)
+        response.raise_for_status()
+        if cache is not None:
+            cache.set(cache_key, response.content, ttl)
+        return jsonlib.loads(response.content)
+
+    async def get(self, url: "URLTypes", **kwargs) -> Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: "URLTypes", **kwargs) -> Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class Net(AsyncNet):
+    """同步网络请求，在共享的后台事件循环中驱动 `AsyncNet`"""
+
     def get(
         self,
         url: "URLTypes",
@@ -63,7 +347,8 @@ class Net(BaseModel):
         timeout: Union["TimeoutTypes", "UseClientDefault"] = USE_CLIENT_DEFAULT,
         extensions: Optional["RequestExtensions"] = None,
     ) -> Response:
-        return self.client.get(
+        return run_sync(self.request(
+            "GET",
             url,
             params=params,
             headers=headers,
@@ -72,7 +357,7 @@ class Net(BaseModel):
             follow_redirects=follow_redirects,
             timeout=timeout,
             extensions=extensions,
-        )
+        ))
 
     def post(
         self,
@@ -92,7 +377,8 @@ class Net(BaseModel):
         ] = USE_CLIENT_DEFAULT,
         extensions: Optional["RequestExtensions"] = None,
     ) -> "Response":
-        return self.client.post(
+        return run_sync(self.request(
+            "POST",
             url,
             content=content,
             data=data,
@@ -105,4 +391,7 @@ class Net(BaseModel):
             follow_redirects=follow_redirects,
             timeout=timeout,
             extensions=extensions,
-        )
+        ))
+
+    def close(self) -> None:
+        run_sync(self.aclose())
@@ -0,0 +1,204 @@
+import heapq
+import re
+import threading
+from collections import Counter
+from typing import Generic, Hashable, Iterable, NamedTuple, Optional, Sequence, TypeVar, Union
+
+from models.bangumi import Torrent
+from models.lazy import LazyTorrent
+from utils.const import PREDICT
+from utils.history import HistoryStore
+from utils.releasename import ReleaseName, parse_release
+
+__all__ = ["Prediction", "TitleIndex", "Predictor", "name_tokens", "similarity"]
+
+K = TypeVar("K", bound=Hashable)
+
+_word = re.compile(r'\w+')
+
+
+def name_tokens(release: ReleaseName) -> frozenset[str]:
+    """番名的 token：中文名按相邻两个字切分，外文名按单词切分并转为小写"""
+    tokens = set(_word.findall(release.name_foreign.casefold()))
+    cn = ''.join(_word.findall(release.name_cn))
+    if len(cn) == 1:
+        tokens.add(cn)
+    tokens.update(cn[i:i + 2] for i in range(len(cn) - 1))
+    return frozenset(tokens)
+
+
+def similarity(query: ReleaseName, candidate: ReleaseName, name: float) -> float:
+    """0~1 的相似度：番名的相似度 `name` 与分辨率、语言、编码、字幕组的加权和"""
+    weights = PREDICT.WEIGHTS
+    return (
+        weights.name * name
+        + weights.resolution * (query.resolution == candidate.resolution)
+        + weights.language * (query.language == candidate.language)
+        + weights.codec * (query.codec == candidate.codec)
+        + weights.group * (query.group == candidate.group)
+    )
+
+
+class TitleIndex(Generic[K]):
+    """标题的倒排索引
+
+    每个标题只解析一次。查询时按 token 的倒排表一次性统计所有候选与查询共有的 token 数，
+    只有至少共有一个 token 的候选才参与排序：先批量算出番名的相似度（番名相同时为 1，否则为 token 的 Jaccard 系数）并排序，
+    再从高到低计算完整的相似度，番名部分加上其余字段的满分也进不了前 `limit` 时停止。
+    """
+
+    def __init__(self, titles: Iterable[tuple[K, str]] = ()):
+        self._keys = []  # type: list[K]
+        self._releases = []  # type: list[ReleaseName]
+        self._names = []  # type: list[str]
+        self._sizes = []  # type: list[int]
+        self._postings = {}  # type: dict[str, list[int]]
+        self._indexed = set()  # type: set[K]
+        for key, title in titles:
+            self.add(key, title)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._indexed
+
+    def add(self, key: K, title: str) -> bool:
+        """加入标题，`key` 已经存在时忽略"""
+        if key in self._indexed:
+            return False
+        release = parse_release(title)
+        tokens = name_tokens(release)
+        i = len(self._keys)
+        self._keys.append(key)
+        self._releases.append(release)
+        self._names.append(release.name)
+        self._sizes.append(len(tokens))
+        self._indexed.add(key)
+        for token in tokens:
+            self._postings.setdefault(token, []).append(i)
+        return True
+
+    def search(self, release: ReleaseName, limit: int = PREDICT.LIMIT) -> list[tuple[float, K]]:
+        """按相似度从高到低返回最多 `limit` 个 (相似度, key)"""
+        tokens = name_tokens(release)
+        overlaps = Counter()  # type: Counter[int]
+        for token in tokens:
+            if (posting := self._postings.get(token)) is not None:
+                overlaps.update(posting)
+        query, size, names, sizes = release.name, len(tokens), self._names, self._sizes
+        # 相似度相同时先加入的优先
+        ranked = sorted(
+            (
+                (1.0 if names[i] == query else overlap / (size + sizes[i] - overlap), -i)
+                for i, overlap in overlaps.items()
+            ),
+            reverse=True,
+        )
+        w_name = PREDICT.WEIGHTS.name
+        w_rest = sum(PREDICT.WEIGHTS.values()) - w_name
+        top = []  # type: list[tuple[float, int]]
+        for name, i in ranked:
+            if len(top) >= limit and w_name * name + w_rest < top[0][0]:
+                break
+            item = (similarity(release, self._releases[-i], name), i)
+            if len(top) < limit:
+                heapq.heappush(top, item)
+            else:
+                heapq.heappushpop(top, item)
+        return [(score, self._keys[-i]) for score, i in sorted(top, reverse=True)]
+
+
+class Prediction(NamedTuple):
+    torrent: Union[Torrent, LazyTorrent]
+    confidence: float
+    source: str  # response 或 history
+
+
+class Predictor(object):
+    """为待发布的标题在上传响应的预测种子和本地发布历史中查找最相似的种子
+
+    发布历史的索引在第一次使用时建立，之后每次查询前只加入新同步的种子。
+    另外按 (番名, 分辨率) 记录每个系列最新的一次发布，`template` 不需要上传种子就能给出发布模板。
+    """
+
+    def __init__(self, store: Optional[HistoryStore] = None):
+        self.store = store
+        self._history = TitleIndex()  # type: TitleIndex[str]
+        self._latest = {}  # type: dict[tuple[str, str], tuple[float, str, str]]  # (发布时间, 种子 id, 标题)
+        self._rowid = 0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """把发布历史中新增的种子加入索引，返回新增的条数"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            added = 0
+            for rowid, torrent_id, title, publish_time in self.store.titles(after=self._rowid):
+                added += self._history.add(torrent_id, title)
+                self._rowid = max(self._rowid, rowid)
+                release = parse_release(title)
+                if not release.name:
+                    continue
+                key = (release.name, release.resolution)
+                if (latest := self._latest.get(key)) is None or latest[0] < publish_time:
+                    self._latest[key] = (publish_time, torrent_id, title)
+            return added
+
+    def template(self, title: str) -> Optional[Prediction]:
+        """只使用本地发布历史预测发布模板
+
+        优先使用同一系列、同一分辨率最新的一次发布，否则使用相似度不低于 `PREDICT.MIN_CONFIDENCE` 的最相似的种子。
+        """
+        if self.store is None:
+            return None
+        self.refresh()
+        release = parse_release(title)
+        if (latest := self._latest.get((release.name, release.resolution))) is not None:
+            if (torrent := self.store.get(latest[1])) is not None:
+                return Prediction(torrent, 1.0, 'history')
+        if (best := self.best(title)) is not None and best.confidence >= PREDICT.MIN_CONFIDENCE:
+            return best
+        return None
+
+    def latest_title(self, title: str) -> Optional[str]:
+        """同一系列、同一分辨率最新一次发布的标题，不查询种子；`title` 中没有分辨率时只匹配同样没有分辨率的发布"""
+        if self.store is None:
+            return None
+        self.refresh()
+        release = parse_release(title)
+        latest = self._latest.get((release.name, release.resolution))
+        return latest[2] if latest is not None else None
+
+    def rank(self, title: str, torrents: Sequence[Union[Torrent, LazyTorrent]] = (),
+             limit: int = PREDICT.LIMIT) -> list[Prediction]:
+        """按相似度从高到低返回最多 `limit` 个候选，`torrents` 通常是上传响应中的预测种子"""
+        release = parse_release(title)
+        response = TitleIndex((i, t.title) for i, t in enumerate(torrents))  # type: TitleIndex[int]
+        candidates = [(score, 1, i) for score, i in response.search(release, limit)]
+        if self.store is not None:
+            self.refresh()
+            ids = {t.id for t in torrents}
+            candidates.extend(
+                (score, 0, torrent_id)
+                for score, torrent_id in self._history.search(release, limit + len(ids))
+                if torrent_id not in ids
+            )
+        # 相似度相同时优先使用上传响应中的种子
+        candidates.sort(key=lambda c: (c[0], c[1]), reverse=True)
+
+        result = []
+        for score, from_response, key in candidates:
+            if from_response:
+                result.append(Prediction(torrents[key], score, 'response'))
+            elif (torrent := self.store.get(key)) is not None:
+                result.append(Prediction(torrent, score, 'history'))
+            if len(result) >= limit:
+                break
+        return result
+
+    def best(self, title: str, torrents: Sequence[Union[Torrent, LazyTorrent]] = ()) -> Optional[Prediction]:
+        """最相似的候选，没有任何候选时为 None"""
+        result = self.rank(title, torrents, limit=1)
+        return result[0] if result else None
@@ -0,0 +1,138 @@
+import asyncio
+import enum
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from core.client import AsyncBangumi
+from models.bangumi import MyTeam, Torrent
+from utils.bangumi import PublishInfo
+from utils.const import PUBLISH
+from utils.dedupe import InfoHashIndex
+from utils.predict import Predictor
+from utils.releasename import parse_release
+
+__all__ = ["Stage", "PublishJob", "PublishResult", "BatchReport", "episode_of", "publish_one", "publish_batch"]
+
+def episode_of(title: str) -> int:
+    """标题中的集数，例如 `[02集]`、`[17]`、`[30 - END]`，没有时为 0"""
+    return parse_release(title).episode
+
+
+class Stage(enum.Enum):
+    """发布流程所处的阶段"""
+    Queued = '等待中'
+    Uploading = '上传中'
+    Predicting = '匹配中'
+    Publishing = '发布中'
+    Done = '已发布'
+    Failed = '失败'
+
+
+class PublishJob:
+    """一个待发布的种子"""
+    def __init__(self, key: Any, torrentpath: Path, title: str, priority: Optional[int] = None):
+        self.key = key  # 调用方用来识别该任务，例如 (name, relpath)
+        self.torrentpath = torrentpath
+        self.title = title
+        # 越小越先发布，默认集数越新越优先
+        self.priority = -episode_of(title) if priority is None else priority
+
+
+class PublishResult:
+    def __init__(self, job: PublishJob, stage: Stage, torrent: Optional[Torrent] = None,
+                 error: Optional[BaseException] = None):
+        self.job = job
+        self.stage = stage  # 成功时为 Done，失败时为出错的阶段
+        self.torrent = torrent
+        self.error = error
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class BatchReport:
+    """批量发布的汇总结果"""
+    def __init__(self, results: Iterable[PublishResult]):
+        self.results = list(results)
+
+    @property
+    def succeeded(self) -> list[PublishResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> list[PublishResult]:
+        return [r for r in self.results if not r.success]
+
+    def summary(self) -> str:
+        lines = [f'成功 {len(self.succeeded)} 个，失败 {len(self.failed)} 个']
+        for r in self.failed:
+            lines.append(f'{r.job.title}\n    {r.stage.value}: {type(r.error).__name__} {r.error}')
+        return '\n'.join(lines)
+
+
+ProgressCallback = Callable[[PublishJob, Stage], None]
+
+
+async def publish_one(client: AsyncBangumi, myteam: MyTeam, job: PublishJob,
+                      on_progress: Optional[ProgressCallback] = None,
+                      deadline: float = PUBLISH.UPLOAD_DEADLINE,
+                      index: Optional[InfoHashIndex] = None,
+                      predictor: Optional[Predictor] = None) -> PublishResult:
+    """上传 -> 匹配历史发布 -> 发布，出错时返回失败结果而不是抛出
+
+    给出 `index` 时上传前先在本地检查种子是否重复；给出 `predictor` 时同时在本地发布历史中匹配。
+    """
+    def report(stage: Stage):
+        if on_progress:
+            on_progress(job, stage)
+
+    stage = Stage.Uploading
+    try:
+        report(stage)
+        if index is not None:
+            index.check(job.torrentpath)
+        resp = await client.upload_torrent(job.torrentpath, myteam.id, deadline=deadline, lazy=True)
+        assert resp, 'resp 为空!'
+
+        stage = Stage.Predicting
+        report(stage)
+        pubInfo = PublishInfo(myteam, resp, job.title, predictor=predictor)
+        await asyncio.to_thread(pubInfo.loadInfoFromBestPrediction, resp, False)
+
+        stage = Stage.Publishing
+        report(stage)
+        torrent = await client.publish(**pubInfo.to_publish_info())
+    except Exception as e:
+        report(Stage.Failed)
+        return PublishResult(job, stage, error=e)
+    report(Stage.Done)
+    return PublishResult(job, Stage.Done, torrent=torrent)
+
+
+async def publish_batch(client: AsyncBangumi, myteam: MyTeam, jobs: Iterable[PublishJob],
+                        concurrency: int = PUBLISH.CONCURRENCY,
+                        on_progress: Optional[ProgressCallback] = None,
+                        deadline: float = PUBLISH.UPLOAD_DEADLINE,
+                        index: Optional[InfoHashIndex] = None,
+                        predictor: Optional[Predictor] = None) -> BatchReport:
+    """并发发布多个种子，最多同时进行 `concurrency` 个
+
+    任务按 `PublishJob.priority` 从小到大开始，相同时保持原来的顺序；返回的结果与 `jobs` 顺序一致。
+    上传和发布接口的速率由会话的 `RateLimiter` 控制。
+    """
+    jobs = list(jobs)
+    queue = asyncio.PriorityQueue()  # type: asyncio.PriorityQueue[tuple[int, int, PublishJob]]
+    for i, job in enumerate(jobs):
+        queue.put_nowait((job.priority, i, job))
+        if on_progress:
+            on_progress(job, Stage.Queued)
+    results = [None] * len(jobs)  # type: list[Optional[PublishResult]]
+
+    async def worker():
+        while not queue.empty():
+            _, i, job = queue.get_nowait()
+            results[i] = await publish_one(client, myteam, job, on_progress, deadline, index, predictor)
+
+    await asyncio.gather(*(worker() for _ in range(min(max(concurrency, 1), len(jobs)))))
+    return BatchReport(results)
@@ -0,0 +1,73 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Mapping, Optional, Tuple
+
+from utils.const import NET
+
+__all__ = ["TokenBucket", "RateLimiter"]
+
+
+class TokenBucket(object):
+    """令牌桶：平均每秒 `rate` 个令牌，最多积累 `burst` 个
+
+    令牌可以预支为负数，等待者按到达顺序依次获得令牌，
+    因此在持续有请求时发出的速率正好等于 `rate`，不会因为轮询而浪费配额。
+    等待时被取消的预约留下的空位只让给之后的预约，时间不会早于空位本身，不会与已经排定的等待者同时发出。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._vacant = []  # type: list[float]  # 被取消的预约的时刻，升序
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """取走一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            # 已经过去的空位没有人用，对应的令牌也已经计入，直接丢弃
+            while self._vacant and self._vacant[0] <= now:
+                self._vacant.pop(0)
+            if self._vacant:
+                return self._vacant.pop(0) - now
+            self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.burst)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self, due: float):
+        """归还预约在 `due`（`time.monotonic()` 的时刻）但没有使用的令牌，只有之后的预约可以使用"""
+        with self._lock:
+            bisect.insort(self._vacant, due)
+
+    async def acquire(self) -> float:
+        """等待直到获得令牌，返回实际等待的秒数；等待时被取消则归还令牌"""
+        if (delay := self.reserve()) > 0:
+            due = time.monotonic() + delay
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund(due)
+                raise
+        return delay
+
+
+class RateLimiter(object):
+    """按接口路径限流，未配置的路径不受限制"""
+
+    def __init__(self, limits: Optional[Mapping[str, Tuple[float, int]]] = None):
+        if limits is None:
+            limits = {path: (limit.rate, limit.burst) for path, limit in NET.RATE_LIMITS.items()}
+        self.buckets = {
+            path: TokenBucket(rate, burst) for path, (rate, burst) in limits.items() if rate > 0
+        }  # type: dict[str, TokenBucket]
+
+    async def acquire(self, path: str) -> float:
+        """等待 `path` 的令牌，返回等待的秒数"""
+        if (bucket := self.buckets.get(path)) is None:
+            return 0.0
+        return await bucket.acquire()
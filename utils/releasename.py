@@ -0,0 +1,170 @@
+"""
+发布标题解析
+
+    [V2][织梦字幕组]与猫共度的夜晚 夜は猫といっしょ[30 - END][第十三夜][GB_JP][AVC][1080P]
+    [织梦字幕组][宇崎学妹想要玩 第二季 Uzaki-chan wa Asobita S2][02集][1080P][AVC][简日双语]
+    [V2][织梦字幕组]Summer Time Rendering 夏日重现[17][2022.08.05][1080P][GB_JP][AVC].mp4
+
+开头是可选的版本和字幕组，接着是番名（可以不以 [] 包围），其后每个 [] 按内容归类为集数、编码、语言或分辨率，
+无法归类的（日期、副标题等）按顺序保留在 `extras` 中。`retitle` 按已有的标题的写法为新的一集生成标题。
+
+结构部分都是 ASCII，使用标准库 `re`（比 `regex` 快一倍以上）；区分中文和外文名需要 `\p{Han}`，使用 `regex`。
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import regex
+
+__all__ = ["ReleaseName", "parse_release", "retitle"]
+
+_head = re.compile(
+    r'^(?:\[(?P<version>v\d+)\])?\[(?P<group>[^\[\]]+)\]\[?(?P<title>[^\[\]]+)\]?(?=\[)',
+    re.I,
+)
+# 番名：前中文后外文，或前外文后中文，中间以空格隔开
+_cn_foreign = regex.compile(r'^(?P<cn>\p{Han}.*\p{Han})\s+(?P<foreign>\S.*)$')
+_foreign_cn = regex.compile(r'^(?P<foreign>[^\p{Han}].*?)\s+(?P<cn>\p{Han}.*)$')
+# 每个 [] 只匹配一次，由命中的分组决定归类
+_tag = re.compile(
+    r'^(?P<episode>\d{1,4})(?P<episode_suffix>集|话|話)?(?:(?P<episode_v>v)(?P<episode_version>\d+))?'
+    r'(?P<end>\s*-\s*END)?$'
+    r'|^(?P<version>v\d+)$'
+    r'|^(?P<language>(?:简|繁|中|日|英|双语|多语|内封|内嵌|GB|BIG5|CH[ST]|JPN?|[_&\s])+)$'
+    r'|\b(?P<codec>AVC|HEVC|AV1|x26[45]|H\.?26[45])\b'
+    r'|\b(?:\d{3,4}x)?(?P<lines>2160|1080|720|480)[PI]?\b'
+    r'|\b(?P<uhd>4K)\b',
+    re.I,
+)
+_resolution = re.compile(r'\b(?:\d{3,4}x)?(?P<lines>2160|1080|720|480)[PI]?\b|\b(?P<uhd>4K)\b', re.I)
+_han = regex.compile(r'\p{Han}')
+_extension = re.compile(r'\.\w{2,4}$')
+
+
+class ReleaseName(NamedTuple):
+    group: str = ''
+    name_cn: str = ''
+    name_foreign: str = ''
+    episode: int = 0  # 没有时为 0
+    version: str = ''  # 例如 V2
+    codec: str = ''
+    language: str = ''
+    resolution: str = ''  # 例如 1080
+    end: bool = False  # 集数带有 END
+    extras: tuple[str, ...] = ()  # 无法归类的标签，例如日期、副标题
+
+    @property
+    def name(self) -> str:
+        """用于匹配同一系列的番名，优先使用中文名"""
+        return self.name_cn or self.name_foreign
+
+
+def _split_title(title: str) -> tuple[str, str]:
+    title = title.strip()
+    if ' ' in title and (res := _cn_foreign.match(title) or _foreign_cn.match(title)):
+        return res['cn'], res['foreign']
+    if _han.search(title):
+        return title, ''
+    return '', title
+
+
+@lru_cache(maxsize=4096)
+def parse_release(title: str) -> ReleaseName:
+    """解析发布标题，结果会被缓存"""
+    title = _extension.sub('', title.strip())
+    if not (head := _head.match(title)):
+        res = _resolution.search(title)
+        return ReleaseName(resolution=res and ('2160' if res['uhd'] else res['lines']) or '')
+
+    name_cn, name_foreign = _split_title(head['title'])
+    version = (head['version'] or '').upper()
+    episode, codec, language, resolution, end = 0, '', '', '', False
+    extras = []  # type: list[str]
+    # 用 str.split 切分比 findall 快得多
+    for tag in title[head.end() + 1:].split('['):
+        if not (res := _tag.search(content := tag.partition(']')[0].strip())):
+            if content:
+                extras.append(content)
+            continue
+        if res['episode']:
+            if not episode:
+                episode = int(res['episode'])
+                end = bool(res['end'])
+                version = version or ('V' + res['episode_version'] if res['episode_version'] else '')
+        elif res['version']:
+            version = version or res['version'].upper()
+        elif res['language']:
+            language = language or res['language']
+        elif res['codec']:
+            codec = codec or res['codec']
+        elif not resolution:
+            resolution = '2160' if res['uhd'] else res['lines']
+    return ReleaseName(head['group'], name_cn, name_foreign, episode, version, codec, language, resolution,
+                       end, tuple(extras))
+
+
+@lru_cache(maxsize=4096)
+def retitle(template: str, release: ReleaseName) -> Optional[str]:
+    """按模板标题的写法生成 `release` 的标题，结果会被缓存
+
+    字幕组、番名、标签的顺序和集数的位数、后缀保持模板的写法；集数、版本、END、编码、语言和分辨率以 `release` 为准，
+    `release` 中没有的编码、语言和分辨率保留模板的，模板中没有的加在最后。版本放在模板中原来的位置（开头、集数中或单独的标签），
+    模板中没有时放在开头。无法归类的标签按顺序换成 `release` 的，模板中多出的去掉，`release` 中多出的放在最后一个
+    无法归类的标签之后（模板中没有时放在集数之后）。模板或 `release` 没有集数时返回 None。
+    """
+    template = _extension.sub('', template.strip())
+    if not release.episode or not (head := _head.match(template)):
+        return None
+    digits = release.version[1:]
+    extras = list(release.extras)
+    parts = []  # type: list[str]
+    # release 中多出的无法归类的标签插入的位置
+    anchor = None  # type: Optional[int]
+    episode, placed = False, bool(head['version'])
+    seen = set()  # type: set[str]
+    for tag in template[head.end() + 1:].split('['):
+        content, _, rest = tag.partition(']')
+        if not (res := _tag.search(content := content.strip())):
+            # 模板中多出的日期、副标题等属于以前的某一集，去掉
+            parts.append(f'[{extras.pop(0)}]{rest}' if extras else rest)
+            anchor = len(parts)
+        elif res['episode'] and not episode:
+            episode = True
+            content = f"{release.episode:0{len(res['episode'])}d}{res['episode_suffix'] or ''}"
+            if res['episode_version']:
+                placed = True
+                content += res['episode_v'] + digits if digits else ''
+            if release.end:
+                content += res['end'] or ' - END'
+            parts.append(f'[{content}]{rest}')
+            anchor = len(parts) if anchor is None else anchor
+        elif res['version']:
+            placed = True
+            parts.append(f"[{res['version'][0]}{digits}]{rest}" if digits else rest)
+        elif res['episode']:
+            parts.append(f'[{content}]{rest}')
+        else:
+            if res['language']:
+                seen.add('language')
+                content = release.language or content
+            elif res['codec']:
+                seen.add('codec')
+                if release.codec:
+                    content = content[:res.start('codec')] + release.codec + content[res.end('codec'):]
+            else:
+                seen.add('resolution')
+                if release.resolution and release.resolution != ('2160' if res['uhd'] else res['lines']):
+                    content = f'{content[:res.start()]}{release.resolution}P{content[res.end():]}'
+            parts.append(f'[{content}]{rest}')
+    if not episode:
+        return None
+    if extras:
+        parts[anchor:anchor] = [f'[{extra}]' for extra in extras]
+    for field, content in (('codec', release.codec), ('language', release.language),
+                           ('resolution', release.resolution and release.resolution + 'P')):
+        if content and field not in seen:
+            parts.append(f'[{content}]')
+    prefix = ''
+    if digits and (head['version'] or not placed):
+        prefix = f"[{(head['version'] or 'V')[0]}{digits}]"
+    return prefix + template[head.start('group') - 1:head.end()] + ''.join(parts)
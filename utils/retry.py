@@ -0,0 +1,137 @@
+import enum
+import random
+import threading
+import time
+from typing import Iterable, Optional
+
+from httpx import (
+    ConnectError,
+    ConnectTimeout,
+    PoolTimeout,
+    Response,
+    TransportError,
+)
+
+from errors import CircuitOpenError
+from utils.const import NET
+
+__all__ = ["RetryPolicy", "CircuitBreaker", "CircuitState"]
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+"""按 HTTP 语义幂等的方法"""
+
+UNSENT_ERRORS = (ConnectError, ConnectTimeout, PoolTimeout)
+"""请求还没有发送到服务器时的错误，无论是否幂等都可以安全重试"""
+
+
+class RetryPolicy(object):
+    """重试与退避策略
+
+    - 连接未建立的错误总是重试；
+    - 其余网络错误和 `retry_statuses` 中的状态码只有幂等请求才重试，
+      POST 请求需要在 `idempotent_paths` 中显式声明，例如 `/api/torrent/add` 重试会导致重复发布；
+    - 退避时间为 `backoff * 2 ** attempt`，上限 `backoff_max`，开启 `jitter` 时在 [0, 该值] 内随机取值。
+    """
+
+    def __init__(
+        self,
+        retries: int = NET.RETRIES,
+        backoff: float = NET.BACKOFF,
+        backoff_max: float = NET.BACKOFF_MAX,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = NET.RETRY_STATUSES,
+        idempotent_paths: Iterable[str] = NET.IDEMPOTENT_PATHS,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_paths = frozenset(idempotent_paths)
+
+    def is_idempotent(self, method: str, path: str) -> bool:
+        return method.upper() in SAFE_METHODS or path in self.idempotent_paths
+
+    def should_retry(
+        self,
+        method: str,
+        path: str,
+        attempt: int,
+        response: Optional[Response] = None,
+        error: Optional[BaseException] = None,
+    ) -> bool:
+        """`attempt` 为已经重试过的次数"""
+        if attempt >= self.retries:
+            return False
+        if error is not None:
+            if isinstance(error, UNSENT_ERRORS):
+                return True
+            return isinstance(error, TransportError) and self.is_idempotent(method, path)
+        if response is not None and response.status_code in self.retry_statuses:
+            # 429 说明请求被拒绝而未被处理
+            return response.status_code == 429 or self.is_idempotent(method, path)
+        return False
+
+    def delay(self, attempt: int, response: Optional[Response] = None) -> float:
+        """第 `attempt` 次重试前需要等待的秒数"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff * 2 ** attempt, self.backoff_max)
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitState(enum.Enum):
+    Closed = "closed"
+    Open = "open"
+    HalfOpen = "half-open"
+
+
+class CircuitBreaker(object):
+    """熔断器
+
+    连续失败 `failure_threshold` 次后打开，之后的请求立即失败；
+    `reset_timeout` 秒后放行一个试探请求，成功则关闭，失败则继续打开。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = NET.BREAKER_THRESHOLD,
+        reset_timeout: float = NET.BREAKER_RESET,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = CircuitState.Closed
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """请求前调用，熔断时抛出 `CircuitOpenError`"""
+        with self._lock:
+            if self.state == CircuitState.Closed:
+                return
+            if self.state == CircuitState.Open:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self.state = CircuitState.HalfOpen
+                self.opened_at = time.monotonic()
+                return
+            # 半开状态下只放行一个试探请求，试探请求迟迟没有结果（如被取消）时再放行一个
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(0)
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = CircuitState.Closed
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitState.HalfOpen or self.failures >= self.failure_threshold:
+                self.state = CircuitState.Open
+                self.opened_at = time.monotonic()
@@ -0,0 +1,43 @@
+from pathlib import Path
+from typing import Optional
+
+from addict import Dict
+
+import utils.jsonlib as json
+from core.client import AsyncBangumi
+from models.bangumi import MyTeam
+from utils.const import PATHS
+
+__all__ = ["save_session", "load_session", "clear_session"]
+
+
+def save_session(client: AsyncBangumi, myteam: MyTeam, path: Path = PATHS.SESSION):
+    """保存当前会话的 cookies 和所属团队，下次启动时可以跳过密码登录
+
+    文件先写入临时文件再替换，并且只允许当前用户读写。
+    """
+    data = dict(
+        username=client.username,
+        user=client.dump_user(),
+        cookies=client.dump_cookies(),
+        team=myteam.dict(by_alias=True),
+    )
+    json.write_file(data, path, mode=0o600)
+
+
+def load_session(path: Path = PATHS.SESSION) -> Optional[Dict]:
+    """读取保存的会话，包含 username, user, cookies, team 四项，不存在或已损坏时返回 None"""
+    if not path.is_file():
+        return None
+    try:
+        data = Dict(json.read_file(path))
+        data.team = MyTeam.parse_obj(data.team.to_dict())
+    except Exception:
+        return None
+    if not data.cookies or not data.user:
+        return None
+    return data
+
+
+def clear_session(path: Path = PATHS.SESSION):
+    path.unlink(missing_ok=True)
@@ -0,0 +1,143 @@
+import sys
+import threading
+from bisect import bisect_left
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+from models.bangumi import Tag
+
+__all__ = ["TagLocaleRecord", "TagRecord", "TagCatalog"]
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ''
+
+
+class TagLocaleRecord(NamedTuple):
+    zh_cn: str
+    zh_tw: str
+    en: str
+    ja: str
+
+
+class TagRecord(NamedTuple):
+    """精简、不可变的标签，与 `Tag` 一样提供 id、name、type 和 locale"""
+    id: str
+    name: str
+    type: str
+    locale: TagLocaleRecord
+    synonyms: tuple[str, ...]
+
+    @classmethod
+    def from_tag(cls, tag: Tag) -> "TagRecord":
+        locale = tag.locale
+        return cls(
+            _intern(tag.id),
+            _intern(tag.name),
+            _intern(tag.type),
+            TagLocaleRecord(_intern(locale.zh_cn), _intern(locale.zh_tw), _intern(locale.en), _intern(locale.ja)),
+            tuple(_intern(s) for s in tag.syn_lowercase),
+        )
+
+    @property
+    def display_name(self) -> str:
+        """界面上显示的名称"""
+        return self.locale.zh_cn or self.name
+
+    def keys(self) -> set[str]:
+        """可以用来查找该标签的所有名称（已规范化）"""
+        names = (self.name, *self.locale, *self.synonyms)
+        return {normalize(name) for name in names if name}
+
+
+def normalize(name: str) -> str:
+    return name.strip().casefold()
+
+
+class TagCatalog(object):
+    """内存中的标签目录
+
+    标签按 id 去重，按名称、各语言译名和同义词建立索引：精确查找为一次字典查询，
+    前缀查找在有序的名称列表上二分。数据来自 `get_tag_misc`、`suggest` 的结果以及历史发布。
+    """
+
+    def __init__(self, tags: Iterable[Union[Tag, TagRecord]] = ()):
+        self._by_id = {}  # type: dict[str, TagRecord]
+        self._by_key = {}  # type: dict[str, tuple[TagRecord, ...]]
+        self._keys = []  # type: list[str]
+        self._sorted = True
+        self._lock = threading.Lock()
+        self.add(tags)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[TagRecord]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, tag_id: str) -> bool:
+        return tag_id in self._by_id
+
+    def add(self, tags: Iterable[Union[Tag, TagRecord]]) -> int:
+        """加入标签，已有的 id 会被更新，返回新增的个数"""
+        added = 0
+        with self._lock:
+            for tag in tags:
+                record = tag if isinstance(tag, TagRecord) else TagRecord.from_tag(tag)
+                if (old := self._by_id.get(record.id)) is not None:
+                    if old == record:
+                        continue
+                    self._unindex(old)
+                else:
+                    added += 1
+                self._by_id[record.id] = record
+                for key in record.keys():
+                    self._by_key[key] = self._by_key.get(key, ()) + (record,)
+                self._sorted = False
+        return added
+
+    def _unindex(self, record: TagRecord):
+        for key in record.keys():
+            rest = tuple(r for r in self._by_key.get(key, ()) if r.id != record.id)
+            if rest:
+                self._by_key[key] = rest
+            else:
+                self._by_key.pop(key, None)
+
+    def intern(self, tag: Union[Tag, TagRecord]) -> TagRecord:
+        """返回目录中同一 id 的记录，不存在时先加入"""
+        tag_id = tag.id
+        if (record := self._by_id.get(tag_id)) is None:
+            self.add([tag])
+            record = self._by_id[tag_id]
+        return record
+
+    def get_by_id(self, tag_id: str) -> Optional[TagRecord]:
+        return self._by_id.get(tag_id)
+
+    def get(self, name: str, type_: Optional[str] = None) -> Optional[TagRecord]:
+        """按名称、译名或同义词精确查找，`type_` 可以限定标签类型"""
+        for record in self._by_key.get(normalize(name), ()):
+            if type_ is None or record.type == type_:
+                return record
+        return None
+
+    def by_type(self, type_: str) -> list[TagRecord]:
+        return [record for record in self._by_id.values() if record.type == type_]
+
+    def search(self, prefix: str, limit: int = 20, type_: Optional[str] = None) -> list[TagRecord]:
+        """按名称前缀查找，结果按名称排序且不重复"""
+        prefix = normalize(prefix)
+        with self._lock:
+            if not self._sorted:
+                self._keys = sorted(self._by_key)
+                self._sorted = True
+            keys = self._keys
+        result = {}  # type: dict[str, TagRecord]
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            key = keys[i]
+            if not key.startswith(prefix) or len(result) >= limit:
+                break
+            for record in self._by_key.get(key, ()):
+                if type_ is None or record.type == type_:
+                    result.setdefault(record.id, record)
+        return list(result.values())[:limit]
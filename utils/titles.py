@@ -0,0 +1,48 @@
+"""
+新一集的发布标题
+
+视频文件名往往缺少标签或者写法与以往的发布不同，按同一系列最新一次发布的标题改写：
+
+    文件名    [织梦字幕组][电锯人][04集][HEVC][1080P]
+    上一集    [织梦字幕组][电锯人 Chainsaw Man][03集][AVC][简日双语][1080P]
+    生成      [织梦字幕组][电锯人 Chainsaw Man][04集][HEVC][简日双语][1080P]
+
+只使用同一系列、同一分辨率的发布作为模板，文件名中有的编码、语言和分辨率以文件名为准。
+发布历史中没有时使用上传响应中服务器预测的标题，都没有时使用文件名。
+"""
+from typing import Optional, Sequence
+
+from utils.predict import Predictor
+from utils.releasename import parse_release, retitle
+
+__all__ = ["TitleSynthesizer"]
+
+
+class TitleSynthesizer(object):
+    """按系列的发布历史生成新一集的发布标题
+
+    解析和改写的结果都有缓存，查找最新一次发布只是字典查询，不需要联网。
+    """
+
+    def __init__(self, predictor: Optional[Predictor] = None):
+        self.predictor = predictor if predictor is not None else Predictor()  # 没有给出时只使用服务器预测的标题
+
+    def templates(self, title: str, predicted: Sequence[str] = ()) -> list[str]:
+        """可用的模板标题：本地发布历史中最新的一次在前，其后是服务器预测的同一系列、同一分辨率的标题"""
+        release = parse_release(title)
+        result = []
+        if (latest := self.predictor.latest_title(title)) is not None:
+            result.append(latest)
+        result.extend(t for t in predicted
+                      if (p := parse_release(t)).name == release.name and p.resolution == release.resolution)
+        return result
+
+    def synthesize(self, title: str, predicted: Sequence[str] = ()) -> str:
+        """`title` 通常是去掉后缀的视频文件名，`predicted` 是上传响应中服务器预测的标题；没有可用的模板时原样返回"""
+        release = parse_release(title)
+        if not release.name or not release.episode:
+            return title
+        for template in self.templates(title, predicted):
+            if (result := retitle(template, release)) is not None:
+                return result
+        return title
@@ -0,0 +1,96 @@
+"""
+制作单文件种子
+
+文件按分块大小切分，分块的 SHA-1 分成若干个连续的任务（每个约 `TORRENT.TASK_SIZE` 字节）由进程池计算，
+每个进程自己打开文件读取，不需要在进程间传递文件内容。种子先写入临时文件再替换，
+目录监视不会看到写了一半的 `.torrent`。
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional, Sequence, Union
+
+from errors import MakeTorrentFailed
+from utils.bencode import encode
+from utils.const import TORRENT
+from utils.jsonlib import write_bytes
+
+__all__ = ["piece_length_for", "hash_pieces", "create_torrent", "make_torrent"]
+
+
+def piece_length_for(size: int) -> int:
+    """自动选择分块大小：不小于 `TORRENT.MIN_PIECE` 且分块数不超过 `TORRENT.TARGET_PIECES` 的最小的 2 的幂"""
+    length = TORRENT.MIN_PIECE
+    while length < TORRENT.MAX_PIECE and size > length * TORRENT.TARGET_PIECES:
+        length *= 2
+    return length
+
+
+def hash_pieces(path: str, offset: int, length: int, piece_length: int) -> bytes:
+    """从 `offset` 开始的 `length` 字节中各分块的 SHA-1，`offset` 必须是分块的边界"""
+    digests = []  # type: list[bytes]
+    view = memoryview(bytearray(piece_length))
+    with open(path, 'rb', buffering=0) as f:
+        f.seek(offset)
+        while length > 0:
+            size = min(piece_length, length)
+            read = 0
+            while read < size:
+                if not (n := f.readinto(view[read:size])):
+                    raise MakeTorrentFailed(f'{path} 在制作种子时被截断')
+                read += n
+            digests.append(hashlib.sha1(view[:size]).digest())
+            length -= size
+    return b''.join(digests)
+
+
+def create_torrent(path: Union[str, Path], announce: Sequence[str] = (), piece_length: Optional[int] = None,
+                   workers: Optional[int] = None, comment: str = '') -> dict[str, Any]:
+    """计算文件的分块哈希，返回种子的字典
+
+    `piece_length` 为空时自动选择；`workers` 为空或 0 时使用全部 CPU 核，文件小于一个任务时不启动进程池。
+    文件为空时抛出 `MakeTorrentFailed`。
+    """
+    path = Path(path)
+    if not (size := path.stat().st_size):
+        raise MakeTorrentFailed(f'{path} 是空文件')
+    piece_length = piece_length or piece_length_for(size)
+    # 任务大小取分块大小的整数倍
+    step = max(TORRENT.TASK_SIZE // piece_length, 1) * piece_length
+    tasks = [(str(path), offset, min(step, size - offset), piece_length) for offset in range(0, size, step)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        pieces = b''.join(hash_pieces(*task) for task in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pieces = b''.join(pool.map(hash_pieces, *zip(*tasks)))
+    if path.stat().st_size != size:
+        raise MakeTorrentFailed(f'{path} 在制作种子时发生了变化')
+
+    torrent = {
+        'created by': TORRENT.CREATED_BY,
+        'creation date': int(time.time()),
+        'encoding': 'UTF-8',
+        'info': {
+            'length': size,
+            'name': path.name,
+            'piece length': piece_length,
+            'pieces': pieces,
+        },
+    }  # type: dict[str, Any]
+    if announce:
+        torrent['announce'] = announce[0]
+        if len(announce) > 1:
+            torrent['announce-list'] = [[url] for url in announce]
+    if comment:
+        torrent['comment'] = comment
+    return torrent
+
+
+def make_torrent(path: Union[str, Path], output: Optional[Union[str, Path]] = None, **kwargs) -> Path:
+    """制作种子并原子地写入 `output`（默认为 `<path>.torrent`），其余参数见 `create_torrent`"""
+    output = Path(output) if output is not None else Path(f'{path}.torrent')
+    write_bytes(encode(create_torrent(path, **kwargs)), output)
+    return output
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Optional
+
+from core.client import AsyncBangumi
+from errors import AccountTeamError, CookieExpired
+from models.bangumi import MyTeam
+from utils.const import TEAM_NAME
+from utils.history import HistoryStore, sync_history
+
+__all__ = ["warm_up"]
+
+_background = set()  # type: set[asyncio.Task]
+"""正在后台运行的任务，保留引用以免被回收"""
+
+
+def _on_history_synced(task: asyncio.Task):
+    _background.discard(task)
+    if task.cancelled():
+        return
+    if (e := task.exception()) is not None:
+        print('history sync failed:', type(e).__name__, e)
+    else:
+        print('history synced:', task.result(), 'new torrents')
+
+
+async def warm_up(client: AsyncBangumi, team_name: str = TEAM_NAME,
+                  store: Optional[HistoryStore] = None) -> MyTeam:
+    """登录后的预热：并发校验会话、获取所属团队、预取分类标签，返回名为 `team_name` 的团队
+
+    给出 `store` 时同时在后台开始同步发布历史，同步不会阻塞预热的返回。
+    会话失效时抛出 `CookieExpired`，不属于该团队时抛出 `AccountTeamError`。
+    """
+    history = None
+    if store is not None:
+        history = asyncio.create_task(sync_history(client, store))
+    try:
+        session, my_teams, _ = await asyncio.gather(
+            client.session(), client.my_teams(), client.get_tag_misc()
+        )
+        if not session:
+            raise CookieExpired("cookie 无效或已经过期，请尝试使用其它登录方式进行登录。")
+        for myteam in my_teams:
+            if myteam.name == team_name:
+                break
+        else:
+            raise AccountTeamError('登陆账户 ' + client.username + ' 不属于"' + team_name + '"团队！')
+    except BaseException as e:
+        if history is not None:
+            history.cancel()
+        if isinstance(e, CookieExpired):
+            # 与会话同时获取的团队列表可能是失效的 cookie 得到的
+            client.forget_my_teams()
+        raise
+    if history is not None:
+        _background.add(history)
+        history.add_done_callback(_on_history_synced)
+    return myteam
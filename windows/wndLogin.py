@@ -1,3 +1,5 @@
+from typing import Optional
+
 from PyQt5.QtCore import pyqtSlot, pyqtSignal, pyqtBoundSignal, Qt
 from PyQt5.QtWidgets import QDialog
 
@@ -5,19 +7,22 @@ from core.client import Bangumi
 from errors import LoginFailed, AccountTeamError
 from layouts.layoutLogin import Ui_dlgLogin
 from models.bangumi import MyTeam
-from utils.bangumi import assert_team
+from utils.aio import run_sync
 from utils.configs import conf, saveConfigs
 from utils.const import PATHS, TEAM_NAME
 from utils.gui.exception_hook import UncaughtHook, on_exception
 from utils.gui.helpers import wait_on_heavy_process
 from utils.gui.sources import ICONS
-from utils.helpers import make_proxies
+from utils.helpers import make_client_options, make_proxies
+from utils.history import HistoryStore
+from utils.session import clear_session, save_session
+from utils.warmup import warm_up
 
 
 class WndLogin(QDialog, Ui_dlgLogin):
     loggedIn = pyqtSignal(str, Bangumi, MyTeam)  # type: pyqtBoundSignal
 
-    def __init__(self):
+    def __init__(self, store: Optional[HistoryStore] = None):
         QDialog.__init__(self)
         self.setupUi(self)
         self.retranslateUi(self)
@@ -28,6 +33,8 @@ class WndLogin(QDialog, Ui_dlgLogin):
         err_hook = UncaughtHook()
         err_hook._exception_caught.connect(lambda msg: on_exception(self, msg))
 
+        self.store = store
+
         self.loadFromConfigs()
 
     """Utils"""
@@ -70,14 +77,18 @@ class WndLogin(QDialog, Ui_dlgLogin):
 
         try:
             proxies = make_proxies(conf.proxies.addr, conf.proxies.port, conf.proxies.enabled)
-            client = Bangumi.login_with_password(username, pass_, proxies)  # type: Bangumi
-            myteam = assert_team(client, TEAM_NAME)
+            client = Bangumi.login_with_password(username, pass_, proxies, **make_client_options(conf.net))  # type: Bangumi
+            myteam = run_sync(warm_up(client.as_async(), TEAM_NAME, self.store))
 
         except (LoginFailed, AccountTeamError, Exception) as e:
             on_exception(self, '账号登录错误：\n', str(e))
 
         else:
             self.updateConfigs(self.chkAutoLog.isChecked(), self.chkRem.isChecked(), self.txtUsername.text(), self.txtPass.text())
+            if conf.remember:
+                save_session(client, myteam)
+            else:
+                clear_session()
             self.loggedIn.emit(username, client, myteam)
             saveConfigs(PATHS.CONF, conf)
             self.close()
@@ -8,23 +8,32 @@ from PyQt5.QtCore import Qt, pyqtSlot, QModelIndex
 from PyQt5.QtWidgets import QApplication, QMainWindow, QTableView, QMessageBox
 
 from core.client import Bangumi
-from errors import UploadTorrentException, LoginFailed, AccountTeamError
+from errors import UploadTorrentException
 from layouts.layoutMain import Ui_MainWindow  # 由Designer+pyuic生成
 from models.bangumi import MyTeam
-from utils.bangumi import assert_team, PublishInfo
 from utils.configs import saveConfigs, conf
-from utils.const import VERSION, PATHS, TEAM_NAME
+from utils.dedupe import InfoHashIndex
+from utils.const import VERSION, PATHS
 from utils.gui.enums import PubType
 from utils.gui.exception_hook import UncaughtHook, on_exception
 from utils.gui.fileDatabase import FileDatabase as TDB
 from utils.gui.filePicker import FilePicker
-from utils.gui.helpers import wait_on_heavy_process, setOverrideCursorToWait, restoreOverrideCursor, TorrentMakerThread
+from utils.gui.helpers import wait_on_heavy_process, torrent_title, TorrentMakerThread
+from utils.gui.login import LoginThread
 from utils.gui.models.proxyTableModel import ProxyTableModel
 from utils.gui.models.tableModel import TableModel
+from utils.gui.publisher import PublishWorker, UploadThread
 from utils.gui.sources import ICONS, init_icons
-from utils.helpers import make_proxies
+from utils.helpers import make_client_options, make_proxies
+from utils.history import HistoryStore
+from utils.jobqueue import JobQueue
+from utils.predict import Predictor
+from utils.publish import BatchReport, PublishJob, Stage
+from utils.tags import TagCatalog
+from utils.titles import TitleSynthesizer
 from windows.viewCtxMenu import ViewContextMenu
 from windows.wndLogin import WndLogin
+from windows.wndMetrics import WndMetrics
 from windows.wndPubPreview import WndPubPreview
 from windows.wndSettings import WndSettings
 
@@ -47,6 +56,7 @@ class WndMain(QMainWindow, Ui_MainWindow):
         # sub windows
         self.wndPubPreviews = []  # type: list[WndPubPreview]
         self.wndSettings = WndSettings()
+        self.wndMetrics = WndMetrics(lambda: self.client.connection_stats if self.loggedIn else None)
         # 其他初始化设置
         DEBUG = False
         # self.btnLogin.setEnabled(False)
@@ -55,6 +65,13 @@ class WndMain(QMainWindow, Ui_MainWindow):
         self.client = None  # type: Optional[Bangumi]
         self.myteam = None  # type: Optional[MyTeam]
         self.loggedIn = False
+        self.history = HistoryStore()
+        self.jobQueue = JobQueue()
+        self.dupIndex = InfoHashIndex(self.history, self.jobQueue)
+        self.tagCatalog = TagCatalog()
+        self.predictor = Predictor(self.history)
+        self.titles = TitleSynthesizer(self.predictor)
+        self.publishWorker = None  # type: Optional[PublishWorker]
 
         self.picker = FilePicker(self)
         self.viewTodo.contextMenuEvent = lambda a0: self.onContextmenuEvent(PubType.Todo, PubType.Done, a0)
@@ -64,6 +81,7 @@ class WndMain(QMainWindow, Ui_MainWindow):
         self.root = None  # type: Optional[Path]
         # sourceModel读取数据库，不直接显示
         self.sourceModel = TableModel(self)
+        self.sourceModel.predictor = self.predictor
         self.sourceModel.updatedRoot.connect(
             lambda: [self.updateView(self.viewTodo, self.proxyModels[PubType.Todo]),
                      self.updateView(self.viewDone, self.proxyModels[PubType.Done])])
@@ -108,30 +126,44 @@ class WndMain(QMainWindow, Ui_MainWindow):
         else:
             self.updatePubtypeByRow(row, proxyModel, newPubtype)
 
-    @wait_on_heavy_process
     def autoLogin(self):
         if not conf.autoLogin:
             return
 
-        username = conf.username
-        pass_ = conf.pass_
-
-        try:
-            proxies = make_proxies(conf.proxies.addr, conf.proxies.port, conf.proxies.enabled)
-            client = Bangumi.login_with_password(username, pass_, proxies)  # type: Bangumi
-            myteam = assert_team(client, TEAM_NAME)
-
-        except (LoginFailed, AccountTeamError, Exception) as e:
-            on_exception(self, '账号登录错误：\n', str(e))
-
-        else:
-            self.onLoggedIn(username, client, myteam)
+        proxies = make_proxies(conf.proxies.addr, conf.proxies.port, conf.proxies.enabled)
+        # 登录和预热在后台进行，窗口立即可用，完成后再显示账户
+        self.btnLogin.setEnabled(False)
+        self.labAccntDisp.setText('登录中...')
+        td = LoginThread(self, conf.username, conf.pass_, proxies, make_client_options(conf.net), self.history)
+        td.loggedIn.connect(self.onLoggedIn)
+        td.failed.connect(self.onLoginFailed)
+        td.finished.connect(lambda: self.btnLogin.setEnabled(True))
+        td.start()
 
     def onLoggedIn(self, username: str, client: Bangumi, myteam: MyTeam):
         self.client = client
         self.myteam = myteam
         self.labAccntDisp.setText(username)
         self.loggedIn = True
+        # 预热时已经取得，这里直接来自缓存
+        self.tagCatalog.add(client.get_tag_misc())
+        self.startPublishWorker()
+
+    def startPublishWorker(self):
+        """使用当前账户执行发布队列，会先继续上次没有完成的任务"""
+        if self.publishWorker is not None:
+            self.publishWorker.stop()
+            self.publishWorker.wait()
+        self.publishWorker = PublishWorker(self, self.client, self.myteam, self.jobQueue,
+                                           int(conf.publish.concurrency), float(conf.publish.uploadDeadline),
+                                           self.dupIndex, self.predictor)
+        self.publishWorker.progress.connect(self.onPublishProgress)
+        self.publishWorker.reported.connect(self.onPublishReported)
+        self.publishWorker.start()
+
+    def onLoginFailed(self, msg: str):
+        self.labAccntDisp.setText('未登录')
+        on_exception(self, '账号登录错误：\n', msg)
 
     def onNamesAdded(self, dir: Path, added_names: set[str]):
         """auto make torrents on new names added"""
@@ -140,10 +172,14 @@ class WndMain(QMainWindow, Ui_MainWindow):
         print('on added', paths)
         self.sourceModel.addPendings(paths)
         td = TorrentMakerThread(self, paths, silent=True)
+        td.failed.connect(self.onMakeTorrentFailed)
         td.start()
         # 无论种子是否添加都要removePending，防止卡住
         td.finished.connect(lambda: self.sourceModel.removePendings(paths))
 
+    def onMakeTorrentFailed(self, msg: str):
+        on_exception(self, '制作种子失败：\n', msg)
+
     def onTorrentsAdded(self, dir: Path, added_torrents: set[str]):
         print('add torrents:', '\n'.join(added_torrents))
         vidpaths = set()
@@ -184,6 +220,10 @@ class WndMain(QMainWindow, Ui_MainWindow):
     def on_actSettings_triggered(self):
         self.wndSettings.show()
 
+    @pyqtSlot()
+    def on_actMetrics_triggered(self):
+        self.wndMetrics.show()
+
 
     """Context Menu"""
     @wait_on_heavy_process
@@ -203,76 +243,74 @@ class WndMain(QMainWindow, Ui_MainWindow):
         vidpath = self.root.joinpath(relpathIdx.data(), nameIdx.data())
         torrentpath = Path(str(vidpath) + '.torrent')
         try:
-            resp = self.client.upload_torrent(torrentpath, self.myteam.id)
-            assert resp, 'resp 为空!'
+            self.dupIndex.check(torrentpath)
         except (UploadTorrentException, Exception) as e:
             on_exception(self, '文件上传失败 ' + type(e).__name__ + '\n', str(e))
             return
 
-        while torrentpath.suffix:
-            torrentpath = torrentpath.with_suffix('')
-        title = torrentpath.stem
-
-        wndPubPreview = WndPubPreview(self.client, self.myteam, resp, title)
+        # 先按本地发布历史显示模板，种子在后台上传
+        title = self.titles.synthesize(torrent_title(vidpath))
+        wndPubPreview = WndPubPreview(self.client, self.myteam, None, title, self.tagCatalog, self.predictor)
         wndPubPreview.setAttribute(Qt.WA_DeleteOnClose)
         wndPubPreview.published.connect(lambda: self.onPublishSucceed(row, proxyModel, newPubtype))
         self.wndPubPreviews.append(wndPubPreview)
         wndPubPreview.show()
 
+        td = UploadThread(self, self.client, torrentpath, self.myteam.id)
+        td.uploaded.connect(wndPubPreview.setUploadResponse)
+        td.failed.connect(wndPubPreview.onUploadFailed)
+        td.finished.connect(td.deleteLater)
+        td.start()
+
     def onPubDirectAction(self, view: QTableView, proxyModel: ProxyTableModel, newPubtype: PubType):
         # update pubtype if publish success
         idxes = [idx for idx in view.selectedIndexes() if idx.column() == TDB.COL_NAME]
         if not idxes:
             return
         assert self.loggedIn, '请先登录！'
-        # publish multiple selections together
-
+        # publish multiple selections in background through the persistent queue
+        jobs = []
         for idx in idxes:
-            setOverrideCursorToWait()
-            row = idx.row()
-
             nameIdx = idx.siblingAtColumn(TDB.COL_NAME)
             relpathIdx = idx.siblingAtColumn(TDB.COL_RELPATH)
             vidpath = self.root.joinpath(relpathIdx.data(), nameIdx.data())
             torrentpath = Path(str(vidpath) + '.torrent')
-            try:
-                resp = self.client.upload_torrent(torrentpath, self.myteam.id)
-                assert resp, 'resp 为空!'
-            except (UploadTorrentException, Exception) as e:
-                on_exception(self, nameIdx.data() + ' 文件上传失败 ' + type(e).__name__ + '\n', str(e))
-                continue
-
-            while torrentpath.suffix:
-                torrentpath = torrentpath.with_suffix('')
-            title = torrentpath.stem
-
-            try:
-                pubInfo = PublishInfo(self.myteam, resp, title)
-                pubInfo.loadInfoFromBestPrediction(resp, allow_edit=False)
-
-                self.client.publish(**pubInfo.to_publish_info())
-            except Exception as e:
-                restoreOverrideCursor()
-                # 如果出错跳转到编辑窗口
-                # res = QMessageBox.warning(None, '自动发布失败', nameIdx.data() + ' 发布失败\n' + type(e).__name__ + '\n' + str(e) + '\n是否打开手动编辑窗口？', QMessageBox.Yes | QMessageBox.No)
-                res = QMessageBox.warning(None, '自动发布失败', nameIdx.data() + ' 发布失败\n' + type(e).__name__ + '\n' + str(e), QMessageBox.Ok)
-                if res == QMessageBox.Yes:
-                    wndPubPreview = WndPubPreview(self.client, self.myteam, resp, title)
-                    wndPubPreview.setAttribute(Qt.WA_DeleteOnClose)
-                    wndPubPreview.published.connect(lambda: self.onPublishSucceed(row, proxyModel, newPubtype))
-                    self.wndPubPreviews.append(wndPubPreview)
-                    # FIXME 如果已经打开过编辑窗口，则需要暂时阻塞循环
-                    wndPubPreview.show()
-                continue
-            else:
-                self.onPublishSucceed(row, proxyModel, newPubtype)
-                restoreOverrideCursor()
+            key = (str(self.root), nameIdx.data(), relpathIdx.data(), newPubtype.value)
+            jobs.append(PublishJob(key, torrentpath, self.titles.synthesize(torrent_title(vidpath))))
+
+        added = self.jobQueue.put(jobs)
+        self.statusbar.showMessage(f'已加入发布队列：{added} 个')
+        self.publishWorker.wake()
+
+    def onPublishProgress(self, job: PublishJob, stage: Stage):
+        _, name, _, _ = job.key
+        self.statusbar.showMessage(name + ' ' + stage.value)
+
+    def onPublishReported(self, report: BatchReport):
+        # 任务可能来自上次运行，按各自的工作目录和目标发布状态更新
+        groups = {}  # type: dict[tuple[str, int], list[tuple[str, str]]]
+        for result in report.succeeded:
+            root, name, relpath, newPubtype = result.job.key
+            groups.setdefault((root, newPubtype), []).append((name, relpath))
+        for (root, newPubtype), paths in groups.items():
+            names, relpaths = zip(*paths)
+            self.sourceModel.updatePubtypesByPaths(names, relpaths, PubType(newPubtype), Path(root))
+        if groups:
+            self.updateAllViews()
+        self.statusbar.showMessage('一键发布完成：' + report.summary().splitlines()[0])
+        if report.failed:
+            reply = QMessageBox.question(self, '自动发布失败', report.summary() + '\n\n是否重试失败的任务？',
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                retried = self.jobQueue.retry_failed()
+                self.statusbar.showMessage(f'已重新加入发布队列：{retried} 个')
+                self.publishWorker.wake()
 
     def onMakeBTAction(self, view: QTableView, silent: bool):
         idxes = [idx for idx in view.selectedIndexes() if idx.column() == TDB.COL_NAME]
         if not idxes:
             return
-        if not Path(conf.exe.bc).exists():
+        if conf.torrent.engine == 'bitcomet' and not Path(conf.exe.bc).exists():
             raise FileNotFoundError(conf.exe.bc + ' 不存在！\n请重新配置路径！')
 
         paths = set()
@@ -288,6 +326,7 @@ class WndMain(QMainWindow, Ui_MainWindow):
 
         self.sourceModel.addPendings(paths)
         td = TorrentMakerThread(self, paths, silent)
+        td.failed.connect(self.onMakeTorrentFailed)
         td.start()
         # 无论种子是否添加都要removePending，防止卡住
         td.finished.connect(lambda: self.sourceModel.removePendings(paths))
@@ -324,7 +363,7 @@ class WndMain(QMainWindow, Ui_MainWindow):
     """Slots"""
     @pyqtSlot()
     def on_btnLogin_clicked(self):
-        wndLogin = WndLogin()
+        wndLogin = WndLogin(self.history)
         wndLogin.loggedIn.connect(self.onLoggedIn)
         wndLogin.exec()
 
@@ -359,6 +398,9 @@ class WndMain(QMainWindow, Ui_MainWindow):
 
     def closeEvent(self, a0: QtGui.QCloseEvent) -> None:
         saveConfigs(PATHS.CONF, conf)
+        if self.publishWorker is not None:
+            self.publishWorker.stop()
+            self.publishWorker.wait()
         a0.accept()
 
     """Misc"""
@@ -0,0 +1,90 @@
+import sys
+from typing import Callable, Optional
+
+from PyQt5.QtCore import Qt, pyqtSlot
+from PyQt5.QtWidgets import QFrame, QFileDialog
+
+from layouts.layoutMetrics import Ui_Metrics  # 由Designer+pyuic生成
+from utils.gui.exception_hook import UncaughtHook, on_exception  # 见'exception hook'
+from utils.gui.sources import ICONS
+from utils.metrics import METRICS, Metrics
+from utils.net import ConnectionStats
+
+
+def format_metrics(metrics: Metrics) -> str:
+    """按接口汇总为便于阅读的文本"""
+    lines = []
+    for endpoint, data in metrics.to_dict().items():
+        total = data['total']
+        lines.append(endpoint)
+        lines.append(f"  请求 {total['count']} 次  平均 {total['avg'] * 1000:.0f}ms  p95 ≤ {total['p95']}s"
+                     f"  重试 {data['retries']} 次  限流 {data['throttled']} 次 {data['throttle_seconds']:.1f}s")
+        if data['phases']:
+            lines.append('  阶段 ' + '  '.join(
+                f"{phase} {h['avg'] * 1000:.0f}ms" for phase, h in data['phases'].items()))
+        lines.append(f"  发送 {data['bytes_sent']}B  接收 {data['bytes_received']}B")
+        lines.append('  状态 ' + '  '.join(f'{status}×{n}' for status, n in data['statuses'].items()))
+    return '\n'.join(lines) or '暂无请求'
+
+
+class WndMetrics(QFrame, Ui_Metrics):
+    def __init__(self, getStats: Optional[Callable[[], Optional[ConnectionStats]]] = None):
+        super().__init__()
+        self.setupUi(self)
+        self.retranslateUi(self)
+        self.setWindowIcon(ICONS.MAIN)
+
+        # window settings
+        self.setWindowFlags(Qt.WindowCloseButtonHint)
+
+        # exception handling
+        err_hook = UncaughtHook()
+        err_hook._exception_caught.connect(lambda msg: on_exception(self, msg))
+
+        self.getStats = getStats
+
+    def showEvent(self, a0):
+        self.refresh()
+        super().showEvent(a0)
+
+    """utils"""
+    def refresh(self):
+        stats = self.getStats() if self.getStats else None
+        if stats is None:
+            self.labConn.setText('连接：未登录')
+        else:
+            self.labConn.setText(f'连接：请求 {stats.requests} 次，新建连接 {stats.connections} 个，'
+                                 f'TLS 握手 {stats.tls_handshakes} 次，复用率 {stats.reuse_ratio:.0%}')
+        self.txtMetrics.setPlainText(format_metrics(METRICS))
+
+    def export(self, caption: str, filter_: str, content: str):
+        path, _ = QFileDialog.getSaveFileName(self, caption, '', filter_)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    """slots"""
+    @pyqtSlot()
+    def on_btnRefresh_clicked(self):
+        self.refresh()
+
+    @pyqtSlot()
+    def on_btnClear_clicked(self):
+        METRICS.clear()
+        self.refresh()
+
+    @pyqtSlot()
+    def on_btnExportJson_clicked(self):
+        self.export('导出 JSON', 'JSON (*.json)', METRICS.to_json())
+
+    @pyqtSlot()
+    def on_btnExportProm_clicked(self):
+        self.export('导出 Prometheus', 'Prometheus (*.prom *.txt)', METRICS.to_prometheus())
+
+
+if __name__ == '__main__':
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    wnd = WndMetrics()
+    wnd.show()
+    sys.exit(app.exec_())
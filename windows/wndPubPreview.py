@@ -1,24 +1,28 @@
 import sys
-from typing import Iterable
+from typing import Iterable, Optional
 
-from PyQt5.QtCore import Qt, pyqtSlot, pyqtSignal, pyqtBoundSignal
+from PyQt5.QtCore import Qt, QStringListModel, pyqtSlot, pyqtSignal, pyqtBoundSignal
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtWidgets import QWidget, QSizePolicy
+from PyQt5.QtWidgets import QWidget, QSizePolicy, QCompleter, QMessageBox
 
 from core.client import Bangumi
-from errors import ApplicationException
+from errors import ApplicationException, TagNotFound
 from layouts.layoutPubPreview import Ui_PubEdit
 from models.bangumi import UploadResponse, MyTeam
 from utils.bangumi import PublishInfo
 from utils.gui.exception_hook import UncaughtHook, on_exception
 from utils.gui.helpers import wait_on_heavy_process
 from utils.gui.sources import ICONS
+from utils.predict import Predictor
+from utils.tags import TagCatalog
 
 
 class WndPubPreview(QWidget, Ui_PubEdit):
     published = pyqtSignal()  # type: pyqtBoundSignal
 
-    def __init__(self, client: Bangumi, myteam: MyTeam, resp: UploadResponse, title: str = ''):
+    def __init__(self, client: Bangumi, myteam: MyTeam, resp: Optional[UploadResponse], title: str = '',
+                 catalog: Optional[TagCatalog] = None, predictor: Optional[Predictor] = None):
+        """`resp` 为 None 时表示种子还在上传，先显示本地发布历史中的模板，上传完成后调用 `setUploadResponse`"""
         super().__init__()
         self.setupUi(self)
         self.retranslateUi(self)
@@ -39,14 +43,26 @@ class WndPubPreview(QWidget, Ui_PubEdit):
         err_hook = UncaughtHook()
         err_hook._exception_caught.connect(lambda msg: on_exception(self, msg))
 
-        self.txtTags.setReadOnly(True)  # TODO debug only
         self.txtTeam.setReadOnly(True)
 
         self.client = client
+        self.shownTexts = {}  # type: dict  # 上次 setUiTextsByInfo 显示的内容，用于判断用户是否修改过
+        self.catalog = catalog if catalog is not None else TagCatalog()
+
+        # 标签补全：只补全最后一个 ; 之后的名称
+        self.tagCompleter = QCompleter(QStringListModel(self), self)
+        self.tagCompleter.setWidget(self.txtTags)
+        self.tagCompleter.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.tagCompleter.activated[str].connect(self.insertTag)
+
         # TODO make myteam optional
-        self.pubInfo = PublishInfo(myteam, resp, title)
-        # TODO comboCat init different categories
-        self.pubInfo.loadInfoFromBestPrediction(resp, allow_edit=True)
+        self.pubInfo = PublishInfo(myteam, resp, title, self.catalog, predictor, pretty_intro=True)
+        if resp is None:
+            self.pubInfo.loadInfoFromTemplate()
+            self.btnPublish.setEnabled(False)
+            self.btnPublish.setToolTip('种子上传中...')
+        else:
+            self.pubInfo.loadInfoFromBestPrediction(resp, allow_edit=True)
         self.setUiTextsByInfo(**self.pubInfo.to_ui_texts())
         self.setIntroEditMode()
 
@@ -55,17 +71,90 @@ class WndPubPreview(QWidget, Ui_PubEdit):
     def publish(self):
         self.client.publish(**self.pubInfo.to_publish_info())
 
-    # def addUiTags(self, tagnames: Iterable[str]):
-    #     # remove anything after btnAddTag, append new LineEdit, horizontal policy set to preferred, add again
-    #     self.pubInfo.set_tags_by_name(tagnames)
-    #     ...
+    def setUploadResponse(self, resp: UploadResponse):
+        """种子上传完成：没有本地模板时按服务器的预测填写，否则用服务器的预测核对模板
+
+        上传期间用户修改过的内容以界面为准，只填写没有修改过的。
+        """
+        loaded = self.pubInfo.matched_torrent is not None
+        edited = self.editedTexts()
+        self.pubInfo.title = self.txtTitle.text()
+        warning = self.pubInfo.setUploadResponse(resp, allow_edit=True)
+        if not loaded:
+            if 'title' in edited:
+                self.pubInfo.title = edited['title']
+            texts = self.pubInfo.to_ui_texts()
+            self.setUiTextsByInfo(**(texts | edited))
+            # 修改过的内容仍然与 pubInfo 不同，发布时按界面重新设置
+            self.shownTexts.update((key, texts[key]) for key in edited)
+            if 'category' in edited:
+                try:
+                    self.pubInfo.set_category_by_name(edited['category'])
+                except TagNotFound:
+                    pass
+            self.setIntroEditMode()
+        self.btnPublish.setEnabled(True)
+        self.btnPublish.setToolTip('')
+        if warning:
+            QMessageBox.warning(self, '模板核对', warning, QMessageBox.Ok)
+
+    def onUploadFailed(self, msg: str):
+        on_exception(self, '文件上传失败 ', msg)
+        self.close()
+
+    def uiTexts(self) -> dict:
+        """界面上当前的内容，与 `setUiTextsByInfo` 的参数对应"""
+        return dict(
+            title=self.txtTitle.text(),
+            category=self.comboCat.currentText(),
+            tagnames=self.splitTags(),
+            intro_html=self.txtIntro.toPlainText(),
+            team=self.txtTeam.text(),
+        )
+
+    def editedTexts(self) -> dict:
+        """上次 `setUiTextsByInfo` 之后用户修改过的内容"""
+        return {key: value for key, value in self.uiTexts().items() if value != self.shownTexts.get(key)}
+
+    def splitTags(self) -> list[str]:
+        return [name.strip() for name in self.txtTags.text().split(';') if name.strip()]
+
+    @wait_on_heavy_process
+    def resolveTags(self) -> list[str]:
+        """在标签目录中查找输入的标签，找不到的通过 suggest 查询后再找一次，返回仍然找不到的名称"""
+        missing = []
+        for name in self.splitTags():
+            if self.catalog.get(name) is None:
+                self.catalog.add(self.client.suggest(name))
+                if self.catalog.get(name) is None:
+                    missing.append(name)
+        return missing
+
+    def markUnknownTags(self, names: list[str]):
+        if names:
+            self.txtTags.setStyleSheet('color: red')
+            self.txtTags.setToolTip('未找到标签：' + '; '.join(names))
+        else:
+            self.txtTags.setStyleSheet('')
+            self.txtTags.setToolTip('')
+
+    def insertTag(self, name: str):
+        """用补全的名称替换最后一个标签"""
+        head, sep, _ = self.txtTags.text().rpartition(';')
+        self.txtTags.setText(f'{head}{sep} {name}; ' if sep else f'{name}; ')
 
     """Slots"""
     @pyqtSlot()
     def on_btnPublish_clicked(self):
         try:
             self.pubInfo.title = self.txtTitle.text()
+            # 没有修改过的标签保持原来的 id：不同的标签可能有相同的名称
+            if 'tagnames' in self.editedTexts():
+                self.pubInfo.set_tags_by_name(self.splitTags())
             self.publish()
+        except TagNotFound as e:
+            self.markUnknownTags(e.names)
+            on_exception(self, str(e))
         except ApplicationException as e:
             # TODO 提示当前匹配的历史种子文件是哪一个
             on_exception(self, str(e))
@@ -75,7 +164,29 @@ class WndPubPreview(QWidget, Ui_PubEdit):
 
     @pyqtSlot(str)
     def on_comboCat_currentTextChanged(self, text):
-        self.pubInfo.set_category_by_name(text)
+        try:
+            self.pubInfo.set_category_by_name(text)
+        except TagNotFound as e:
+            on_exception(self, str(e))
+
+    @pyqtSlot(str)
+    def on_txtTags_textEdited(self, text):
+        prefix = text.rpartition(';')[2].strip()
+        if not prefix:
+            self.tagCompleter.popup().hide()
+            return
+        names = [record.display_name for record in self.catalog.search(prefix)]
+        self.tagCompleter.model().setStringList(names)
+        if names:
+            self.tagCompleter.complete()
+        else:
+            self.tagCompleter.popup().hide()
+
+    @pyqtSlot()
+    def on_txtTags_editingFinished(self):
+        if self.tagCompleter.popup().isVisible():
+            return
+        self.markUnknownTags(self.resolveTags())
 
     @pyqtSlot()
     def on_btnEditIntro_clicked(self):
@@ -91,17 +202,21 @@ class WndPubPreview(QWidget, Ui_PubEdit):
     def on_txtIntro_textChanged(self):
         self.pubInfo.intro_html = self.txtIntro.toPlainText()
 
-    # @pyqtSlot()
-    # def on_btnAddTag_clicked(self):
-    #     ...
-
     """misc"""
     def setUiTextsByInfo(self, title: str, category: str, tagnames: Iterable[str], intro_html: str, team: str):
+        tagnames = list(tagnames)
         self.txtTitle.setText(title)
-        self.comboCat.addItem(category)
+        self.comboCat.blockSignals(True)
+        self.comboCat.clear()
+        self.comboCat.addItems(sorted(record.display_name for record in self.catalog.by_type('misc')))
+        if self.comboCat.findText(category) < 0:
+            self.comboCat.addItem(category)
+        self.comboCat.setCurrentText(category)
+        self.comboCat.blockSignals(False)
         self.txtTags.setText('; '.join(tagnames))
         self.txtIntro.setPlainText(intro_html)
         self.txtTeam.setText(team)
+        self.shownTexts = self.uiTexts()
 
     def setIntroEditMode(self):
         self.btnEditIntro.hide()
@@ -13,7 +13,7 @@ from utils.gui.exception_hook import UncaughtHook, on_exception  # 见'exception
 from utils.gui.filePicker import FilePicker
 from utils.gui.helpers import heavy_process, restoreOverrideCursor
 from utils.gui.sources import ICONS
-from utils.helpers import make_proxies
+from utils.helpers import make_client_options, make_proxies
 
 
 class WndSettings(QFrame, Ui_Settings):
@@ -71,7 +71,7 @@ class WndSettings(QFrame, Ui_Settings):
         proxies = make_proxies(self.txtProxyAddr.text(), self.txtProxyPort.text(), self.radProxyOn.isChecked())
         try:
             with heavy_process():
-                Bangumi.test_connection(proxies, BANGUMI_MOE_HOST)
+                Bangumi.test_connection(proxies, BANGUMI_MOE_HOST, **make_client_options(conf.net))
         except Exception as e:
             restoreOverrideCursor()
             QMessageBox.critical(self, '连接失败', '\n'.join(